@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        request_started.connect(
+            warm_up, dispatch_uid="api_warm_up_declinations",
+        )
+
+
+def warm_up(**kwargs):
+    """Прогрев кэшей процесса при первом запросе."""
+    from .numbers import warm_up_declinations
+
+    request_started.disconnect(dispatch_uid="api_warm_up_declinations")
+    warm_up_declinations()
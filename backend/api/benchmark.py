@@ -0,0 +1,326 @@
+import random
+import statistics
+import time
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    FavoriteList,
+    Ingredients,
+    RecipeIngredients,
+    Recipes,
+    RecipeTags,
+    ShoppingCart,
+    ShoppingListJob,
+    Tags
+)
+from users.models import CustomUser, Follow
+
+IMAGE = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAA"
+    "CVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAA"
+    "ggCByxOyYQAAAABJRU5ErkJggg=="
+)
+PASSWORD = "Benchmark-Pa55word"
+PAGE_LIMIT = 50
+
+
+class SyntheticDataset:
+    """Синтетический набор данных и запросы ко всем эндпоинтам API.
+
+    Используется командой benchmark_api для замеров времени и тестами
+    бюджетов SQL-запросов.
+    """
+
+    def __init__(self, stdout, seed=0):
+        self.stdout = stdout
+        self.random = random.Random(seed)
+
+    def create(self, users_count, recipes_count, follows, favorites,
+               carts):
+        """Создает синтетический набор данных."""
+        call_command("load_ingredients", stdout=self.stdout)
+        ingredient_ids = list(Ingredients.objects.values_list("id", flat=True))
+        Tags.objects.bulk_create(
+            Tags(name=f"Тег {i}", slug=f"tag-{i}", color="#FF0000")
+            for i in range(10)
+        )
+        CustomUser.objects.bulk_create(
+            CustomUser(
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for i in range(users_count)
+        )
+        # bulk_create заполняет первичные ключи не на всех СУБД.
+        tags = list(Tags.objects.all())
+        users = list(CustomUser.objects.all())
+        Recipes.objects.bulk_create(
+            Recipes(
+                author=self.random.choice(users),
+                name=f"Рецепт {i}",
+                image="images/benchmark.png",
+                text="Описание рецепта " * 20,
+                cooking_time=self.random.randint(1, 120),
+            )
+            for i in range(recipes_count)
+        )
+        recipes = list(Recipes.objects.all())
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(recipe=recipe, ingredient_id=ingredient_id,
+                              amount=self.random.randint(1, 500))
+            for recipe in recipes
+            for ingredient_id in self.random.sample(
+                ingredient_ids, self.random.randint(3, 12))
+        )
+        RecipeTags.objects.bulk_create(
+            RecipeTags(recipe=recipe, tag=tag)
+            for recipe in recipes
+            for tag in self.random.sample(tags, self.random.randint(1, 3))
+        )
+        Follow.objects.bulk_create(
+            (
+                Follow(user=user, author=author)
+                for user in users
+                for author in self.random.sample(users, follows)
+                if author != user
+            ),
+            ignore_conflicts=True,
+        )
+        for model, per_user in ((FavoriteList, favorites),
+                                (ShoppingCart, carts)):
+            model.objects.bulk_create(
+                (
+                    model(user=user, recipe=recipe)
+                    for user in users
+                    for recipe in self.random.sample(recipes, per_user)
+                ),
+                ignore_conflicts=True,
+            )
+        call_command("rebuild_recipe_counters", stdout=self.stdout)
+        call_command("rebuild_shopping_carts", stdout=self.stdout)
+        call_command("rebuild_feeds", stdout=self.stdout)
+        self.user = users[0]
+        self.tags = tags
+        self.ingredient_ids = ingredient_ids
+        self.stdout.write(
+            f"Данные: {len(users)} пользователей, {len(recipes)} рецептов, "
+            f"{len(ingredient_ids)} ингредиентов"
+        )
+
+    def recipe_payload(self):
+        return {
+            "name": "Новый рецепт",
+            "text": "Описание",
+            "cooking_time": 10,
+            "image": IMAGE,
+            "tags": [tag.id for tag in self.random.sample(self.tags, 2)],
+            "ingredients": [
+                {"id": ingredient_id, "amount": 10}
+                for ingredient_id in self.random.sample(
+                    self.ingredient_ids, 10)
+            ],
+        }
+
+    def endpoints(self):
+        """Возвращает эндпоинты в виде (имя, подготовка, запрос).
+
+        Подготовка выполняется вне замера и возвращает аргументы запроса.
+        """
+        user = self.user
+        client = APIClient()
+        client.force_authenticate(user)
+        anonymous = APIClient()
+        tag = self.tags[0]
+        ingredient = Ingredients.objects.first()
+        recipe = Recipes.objects.exclude(author=user).first()
+        author = (CustomUser.objects.exclude(pk=user.pk)
+                  .exclude(following__user=user).first())
+
+        def own_recipe():
+            return Recipes.objects.create(
+                author=user, name="Черновик", text="Описание",
+                cooking_time=5,
+            )
+
+        def favorite():
+            FavoriteList.objects.get_or_create(user=user, recipe=recipe)
+
+        def unfavorite():
+            FavoriteList.objects.filter(user=user, recipe=recipe).delete()
+
+        def cart():
+            ShoppingCart.objects.get_or_create(user=user, recipe=recipe)
+
+        def uncart():
+            ShoppingCart.objects.filter(user=user, recipe=recipe).delete()
+
+        def follow():
+            Follow.objects.get_or_create(user=user, author=author)
+
+        def unfollow():
+            Follow.objects.filter(user=user, author=author).delete()
+
+        def login_user():
+            new_user = CustomUser.objects.create(
+                username=f"login{time.monotonic_ns()}",
+                email=f"login{time.monotonic_ns()}@example.com",
+            )
+            new_user.set_password(PASSWORD)
+            new_user.save()
+            return new_user
+
+        def token_client():
+            token_user = login_user()
+            token_client = APIClient()
+            token_client.post(
+                "/api/auth/token/login/",
+                {"email": token_user.email, "password": PASSWORD},
+            )
+            token = token_user.auth_token.key
+            token_client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+            return token_client
+
+        def get(url, api_client=client):
+            return lambda: api_client.get(url)
+
+        def etag(url):
+            return lambda: client.get(url)["ETag"]
+
+        return (
+            ("tags-list", None, get("/api/tags/")),
+            ("tags-detail", None, get(f"/api/tags/{tag.id}/")),
+            ("ingredients-list", None, get("/api/ingredients/?name=с")),
+            ("ingredients-detail", None,
+             get(f"/api/ingredients/{ingredient.id}/")),
+            ("recipes-list", None,
+             get(f"/api/recipes/?limit={PAGE_LIMIT}")),
+            ("recipes-list-anonymous", None,
+             get(f"/api/recipes/?limit={PAGE_LIMIT}", anonymous)),
+            ("recipes-list-cursor", None,
+             get(f"/api/recipes/?limit={PAGE_LIMIT}&pagination=cursor")),
+            ("recipes-list-popular", None,
+             get(f"/api/recipes/?limit={PAGE_LIMIT}"
+                 "&ordering=-favorites_count")),
+            ("recipes-list-cards", None,
+             get(f"/api/recipes/?limit={PAGE_LIMIT}"
+                 "&fields=id,name,image,cooking_time")),
+            ("recipes-list-filtered", None,
+             get(f"/api/recipes/?limit={PAGE_LIMIT}&tags={tag.slug}"
+                 "&is_favorited=1")),
+            ("recipes-list-not-modified",
+             etag(f"/api/recipes/?limit={PAGE_LIMIT}"),
+             lambda page_etag: client.get(f"/api/recipes/?limit={PAGE_LIMIT}",
+                                         HTTP_IF_NONE_MATCH=page_etag)),
+            ("recipes-feed", None,
+             get(f"/api/recipes/feed/?limit={PAGE_LIMIT}")),
+            ("recipes-search", None,
+             get(f"/api/recipes/?limit={PAGE_LIMIT}"
+                 f"&search={ingredient.name}")),
+            ("recipes-match", None,
+             get(f"/api/recipes/match/?limit={PAGE_LIMIT}&ingredients="
+                 + ",".join(str(pk) for pk in Ingredients.objects.values_list(
+                     "pk", flat=True)[:5]))),
+            ("recipes-detail", None, get(f"/api/recipes/{recipe.id}/")),
+            ("recipes-detail-cached", get(f"/api/recipes/{recipe.id}/"),
+             lambda _: client.get(f"/api/recipes/{recipe.id}/")),
+            ("recipes-create", self.recipe_payload,
+             lambda payload: client.post(
+                 "/api/recipes/", payload, format="json")),
+            ("recipes-update", lambda: (own_recipe(), self.recipe_payload()),
+             lambda args: client.patch(
+                 f"/api/recipes/{args[0].id}/", args[1], format="json")),
+            ("recipes-delete", own_recipe,
+             lambda obj: client.delete(f"/api/recipes/{obj.id}/")),
+            ("recipes-favorite-add", unfavorite,
+             lambda _: client.post(f"/api/recipes/{recipe.id}/favorite/")),
+            ("recipes-favorite-remove", favorite,
+             lambda _: client.delete(f"/api/recipes/{recipe.id}/favorite/")),
+            ("recipes-shopping-cart-add", uncart,
+             lambda _: client.post(
+                 f"/api/recipes/{recipe.id}/shopping_cart/")),
+            ("recipes-shopping-cart-remove", cart,
+             lambda _: client.delete(
+                 f"/api/recipes/{recipe.id}/shopping_cart/")),
+            ("recipes-download-shopping-cart", None,
+             get("/api/recipes/download_shopping_cart/")),
+            ("recipes-download-shopping-cart-txt", None,
+             get("/api/recipes/download_shopping_cart/?format=txt")),
+            ("recipes-download-shopping-cart-job", None,
+             get("/api/recipes/download_shopping_cart/?mode=job")),
+            ("recipes-shopping-cart-job",
+             lambda: ShoppingListJob.objects.create(user=user),
+             lambda job: client.get(
+                 f"/api/recipes/shopping_cart_jobs/{job.pk}/")),
+            ("recipes-shopping-cart-ingredients", None,
+             get("/api/recipes/shopping_cart_ingredients/")),
+            ("users-list", None,
+             get(f"/api/users/?limit={PAGE_LIMIT}")),
+            ("users-detail", None, get(f"/api/users/{author.id}/")),
+            ("users-me", None, get("/api/users/me/")),
+            ("users-create", None,
+             lambda: anonymous.post("/api/users/", {
+                 "username": f"new{time.monotonic_ns()}",
+                 "email": f"new{time.monotonic_ns()}@example.com",
+                 "first_name": "Имя",
+                 "last_name": "Фамилия",
+                 "password": PASSWORD,
+             })),
+            ("users-subscriptions", None,
+             get(f"/api/users/subscriptions/?limit={PAGE_LIMIT}"
+                 "&recipes_limit=3")),
+            ("users-subscribe", unfollow,
+             lambda _: client.post(f"/api/users/{author.id}/subscribe/")),
+            ("users-unsubscribe", follow,
+             lambda _: client.delete(f"/api/users/{author.id}/subscribe/")),
+            ("users-set-password", login_user,
+             lambda new_user: self.force_client(new_user).post(
+                 "/api/users/set_password/",
+                 {"current_password": PASSWORD, "new_password": PASSWORD})),
+            ("auth-token-login", login_user,
+             lambda new_user: anonymous.post(
+                 "/api/auth/token/login/",
+                 {"email": new_user.email, "password": PASSWORD})),
+            ("auth-token-logout", token_client,
+             lambda api_client: api_client.post("/api/auth/token/logout/")),
+        )
+
+    @staticmethod
+    def force_client(user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    @staticmethod
+    def warm_up():
+        """Первый запрос прогревает кэши процесса и не учитывается."""
+        APIClient().get("/api/")
+
+    @staticmethod
+    def measure(prepare, request, repeat):
+        """Выполняет запрос repeat раз.
+
+        Возвращает (максимум SQL-запросов, медиану времени в мс,
+        ответы).
+        """
+        timings, queries, responses = [], [], []
+        for _ in range(repeat):
+            if prepare is None:
+                call = request
+            else:
+                prepared = prepare()
+                call = (lambda arg: lambda: request(arg))(prepared)
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = call()
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+            responses.append(response)
+        return max(queries), statistics.median(timings), responses
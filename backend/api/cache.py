@@ -0,0 +1,226 @@
+import hashlib
+import math
+import random
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers
+)
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+CachedPayload = namedtuple("CachedPayload",
+                           ("content", "etag", "last_modified"))
+CacheEntry = namedtuple("CacheEntry", ("value", "expires_at", "build_time"))
+
+
+def make_payload(data, last_modified=None):
+    """Сериализует данные в JSON и вычисляет для них ETag."""
+    content = JSONRenderer().render(data)
+    return CachedPayload(content, f'"{hashlib.sha1(content).hexdigest()}"',
+                         last_modified)
+
+
+class VersionedCache:
+    """Версионированный кэш с пространствами имен.
+
+    Ключ значения включает версии всех его пространств, поэтому
+    увеличение версии в общем кэше инвалидирует значение во всех
+    процессах.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._local = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def version_key(namespace):
+        return f"versions:{namespace}"
+
+    @staticmethod
+    def initial_version():
+        """Начальный номер версии пространства имен.
+
+        Версии хранятся в кэше и могут быть вытеснены. Новый номер
+        не совпадает с прежними, поэтому вытеснение не возвращает
+        устаревшие значения.
+        """
+        return time.time_ns()
+
+    def version(self, namespace):
+        return cache.get_or_set(self.version_key(namespace),
+                                self.initial_version, None)
+
+    def versions(self, namespaces):
+        """Номера версий нескольких пространств имен за одно обращение."""
+        keys = [self.version_key(namespace) for namespace in namespaces]
+        found = cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                cache.add(key, self.initial_version(), None)
+                found[key] = cache.get(key)
+        return tuple(found[key] for key in keys)
+
+    def invalidate(self, namespace):
+        """Делает устаревшими все значения пространства имен.
+
+        Возвращает новый номер версии.
+        """
+        key = self.version_key(namespace)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            version = self.initial_version()
+            cache.set(key, version, None)
+            return version
+
+    @staticmethod
+    def expires_early(entry):
+        """Досрочное истечение по алгоритму XFetch.
+
+        Чем дольше строится значение и чем ближе срок, тем вероятнее,
+        что запрос перестроит его заранее.
+        """
+        if entry.expires_at is None:
+            return False
+        early = (entry.build_time * settings.CACHE_EARLY_EXPIRY_BETA
+                 * -math.log(1 - random.random()))
+        return time.time() + early >= entry.expires_at
+
+    def get_local(self, local_key):
+        with self._lock:
+            entry = self._local.get(local_key)
+            if entry is not None:
+                self._local.move_to_end(local_key)
+            return entry
+
+    def set_local(self, local_key, entry):
+        with self._lock:
+            self._local[local_key] = entry
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def build(self, shared_key, builder, timeout):
+        start = time.time()
+        value = builder()
+        now = time.time()
+        entry = CacheEntry(
+            value,
+            None if timeout is None else now + timeout,
+            now - start,
+        )
+        cache.set(shared_key, entry, timeout)
+        return entry
+
+    def get_or_build(self, namespaces, key, builder, timeout=None):
+        """Возвращает значение из кэша или строит его вызовом builder().
+
+        namespaces - пространство имен или кортеж пространств, при
+        инвалидации любого из них значение перестраивается.
+        """
+        if isinstance(namespaces, str):
+            namespaces = (namespaces,)
+        if timeout is None:
+            timeout = settings.CACHE_TIMEOUT
+        local_key = (namespaces, self.versions(namespaces), key)
+        entry = self.get_local(local_key)
+        if entry is None or self.expires_early(entry):
+            entry = self.get_shared(local_key, builder, timeout)
+            self.set_local(local_key, entry)
+        return entry.value
+
+    def get_shared(self, local_key, builder, timeout):
+        namespaces = local_key[0]
+        digest = hashlib.md5(repr(local_key).encode()).hexdigest()
+        shared_key = f"{namespaces[0]}:{digest}"
+        entry = cache.get(shared_key)
+        if entry is not None and not self.expires_early(entry):
+            return entry
+        lock_key = f"{shared_key}:lock"
+        if cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+            try:
+                return self.build(shared_key, builder, timeout)
+            finally:
+                cache.delete(lock_key)
+        if entry is not None:
+            # Значение уже перестраивает другой процесс.
+            return entry
+        deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+            entry = cache.get(shared_key)
+            if entry is not None:
+                return entry
+        return self.build(shared_key, builder, timeout)
+
+
+class UncachedResponse(Exception):
+    """Ответ представления, который нельзя кэшировать (не 200 OK)."""
+
+    def __init__(self, response):
+        super().__init__(response)
+        self.response = response
+
+
+def cache_response(*namespaces, timeout=None, per_user=False,
+                   **cache_control):
+    """Кэширует JSON-ответ метода ViewSet.
+
+    namespaces могут ссылаться на аргументы URL ("recipe:{pk}");
+    per_user=True добавляет в ключ пространство "user:<id>".
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            names = tuple(namespace.format(**kwargs)
+                          for namespace in namespaces)
+            user_id = None
+            if per_user and request.user.is_authenticated:
+                user_id = request.user.pk
+                names += (f"user:{user_id}",)
+            key = (f"{method.__name__}:{user_id}:{sorted(kwargs.items())}:"
+                   f"{sorted(request.query_params.lists())}")
+
+            def build():
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    raise UncachedResponse(response)
+                last_modified = parse_http_date_safe(
+                    response.get("Last-Modified", ""))
+                return make_payload(response.data, last_modified)
+
+            try:
+                payload = versioned_cache.get_or_build(names, key, build,
+                                                       timeout)
+            except UncachedResponse as error:
+                return error.response
+            response = HttpResponse(payload.content,
+                                    content_type="application/json")
+            response["ETag"] = payload.etag
+            last_modified = payload.last_modified
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+                if user_id is not None:
+                    last_modified = None
+            patch_cache_control(response, **cache_control)
+            if per_user:
+                patch_vary_headers(response, ("Authorization",))
+            return get_conditional_response(
+                request, etag=payload.etag, last_modified=last_modified,
+                response=response,
+            )
+        return wrapper
+    return decorator
+
+
+versioned_cache = VersionedCache(settings.CACHE_LOCAL_SIZE)
@@ -0,0 +1,89 @@
+import base64
+import binascii
+import io
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image, UnidentifiedImageError
+from rest_framework.exceptions import ValidationError
+
+from recipes.images import encode_image, image_extension, thumbnail_name
+
+# Длина порции base64 должна быть кратна 4, чтобы порции
+# декодировались независимо друг от друга.
+BASE64_CHUNK_SIZE = 64 * 1024
+ALLOWED_FORMATS = ("JPEG", "PNG", "GIF", "WEBP")
+
+
+class RecipeImageField(Base64ImageField):
+    """Изображение рецепта в base64.
+
+    Проверяет размер файла и изображения до полного декодирования,
+    перекодирует картинку в формат хранения. Если задан thumbnail
+    (в аргументе или в контексте сериализатора), отдает ссылку
+    на миниатюру вместо оригинала.
+    """
+    INVALID_FILE_MESSAGE = "Загрузите корректное изображение"
+    INVALID_TYPE_MESSAGE = "Допустимые форматы: JPEG, PNG, GIF, WEBP"
+
+    def __init__(self, *args, thumbnail=None, **kwargs):
+        self.thumbnail = thumbnail
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def decode(data):
+        """Декодирует base64 порциями, не создавая лишних копий строки."""
+        if len(data) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+            raise ValidationError(
+                "Размер изображения не должен превышать "
+                f"{settings.RECIPE_IMAGE_MAX_SIZE // 1024 // 1024} МБ"
+            )
+        buffer = io.BytesIO()
+        try:
+            for start in range(0, len(data), BASE64_CHUNK_SIZE):
+                buffer.write(base64.b64decode(
+                    data[start:start + BASE64_CHUNK_SIZE], validate=True,
+                ))
+        except (TypeError, binascii.Error, ValueError):
+            raise ValidationError(RecipeImageField.INVALID_FILE_MESSAGE)
+        buffer.seek(0)
+        return buffer
+
+    def to_internal_value(self, base64_data):
+        if base64_data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(base64_data, str):
+            raise ValidationError("Изображение должно быть строкой base64")
+        _, _, base64_data = base64_data.rpartition(";base64,")
+        try:
+            image = Image.open(self.decode(base64_data))
+        except (UnidentifiedImageError, Image.DecompressionBombError):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        # Image.open читает только заголовок, поэтому размеры проверяются
+        # до распаковки пикселей.
+        if image.format not in ALLOWED_FORMATS:
+            raise ValidationError(self.INVALID_TYPE_MESSAGE)
+        if max(image.size) > settings.RECIPE_IMAGE_MAX_DIMENSION:
+            raise ValidationError(
+                "Стороны изображения не должны превышать "
+                f"{settings.RECIPE_IMAGE_MAX_DIMENSION} пикселей"
+            )
+        try:
+            content = encode_image(image)
+        except OSError:
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        return SimpleUploadedFile(
+            name=f"{uuid.uuid4()}.{image_extension()}", content=content,
+        )
+
+    def to_representation(self, file):
+        thumbnail = self.thumbnail or self.context.get("thumbnail")
+        if not file or not thumbnail:
+            return super().to_representation(file)
+        url = file.storage.url(thumbnail_name(file.name, thumbnail))
+        request = self.context.get("request")
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
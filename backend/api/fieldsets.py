@@ -0,0 +1,101 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def split_param(request, name):
+    """Значения параметра запроса через запятую или None.
+
+    Учитываются только запросы на чтение: при записи сериализатору
+    нужны все поля.
+    """
+    if (request is None or request.method not in SAFE_METHODS
+            or name not in request.query_params):
+        return None
+    return {
+        value.strip()
+        for value in request.query_params[name].split(",")
+        if value.strip()
+    }
+
+
+def select_fields(paths, prefix=""):
+    """Поля уровня prefix из набора путей. None означает все поля."""
+    if paths is None:
+        return None
+    if prefix:
+        paths = {
+            path[len(prefix) + 1:] for path in paths
+            if path.startswith(f"{prefix}.")
+        }
+        if not paths:
+            return None
+    return {path.split(".", 1)[0] for path in paths}
+
+
+class Fieldset:
+    """Запрошенные поля корневого сериализатора для подготовки queryset."""
+
+    def __init__(self, request):
+        self.fields = select_fields(split_param(request, "fields"))
+        self.expanded = split_param(request, "expand")
+
+    def wants(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return self.wants(name) and (
+            self.expanded is None or name in self.expanded
+        )
+
+
+class SparseFieldsetMixin:
+    """Оставляет в сериализаторе только запрошенные поля.
+
+    ?fields= - поля через запятую, вложенные указываются через точку:
+    ?fields=id,name,author.username. Без параметра возвращаются все поля.
+    ?expand= - связи, которые раскрываются полностью, остальные
+    заменяются полями из get_collapsed_fields() (обычно id).
+    Без параметра раскрываются все связи.
+    """
+
+    def get_collapsed_fields(self):
+        return {}
+
+    def get_field_path(self):
+        names = []
+        field = self
+        while field.parent is not None:
+            if field.field_name:
+                names.append(field.field_name)
+            field = field.parent
+        return ".".join(reversed(names))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        path = self.get_field_path()
+        requested = select_fields(split_param(request, "fields"), path)
+        if requested is not None:
+            fields = {
+                name: field for name, field in fields.items()
+                if name in requested
+            }
+        expanded = split_param(request, "expand")
+        if expanded is not None and not path:
+            for name, field in self.get_collapsed_fields().items():
+                if name in fields and name not in expanded:
+                    fields[name] = field
+        return fields
+
+
+class IdListField(serializers.ReadOnlyField):
+    """id связанных объектов из загруженного менеджера."""
+
+    def __init__(self, attribute, **kwargs):
+        self.id_attribute = attribute
+        super().__init__(**kwargs)
+
+    def to_representation(self, manager):
+        return [
+            getattr(item, self.id_attribute) for item in manager.all()
+        ]
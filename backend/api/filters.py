@@ -1,41 +1,190 @@
-from django_filters import AllValuesMultipleFilter
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import (
+    Case,
+    Exists,
+    FloatField,
+    OuterRef,
+    Value,
+    When
+)
+from django.db.models.functions import Lower
+from django_filters import CharFilter, MultipleChoiceFilter
 from django_filters.rest_framework import BooleanFilter, FilterSet
-from rest_framework.filters import SearchFilter
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
 
-from recipes.models import Recipes
+from recipes.models import (
+    FavoriteList,
+    Recipes,
+    RecipeTags,
+    ShoppingCart,
+    Tags
+)
+from .cache import versioned_cache
+from .search import recipe_search_index
 
 
-class IngredientsSearchFilter(SearchFilter):
-    """Фильтрация ингредиента по имени."""
+def get_tag_ids_by_slug():
+    """Возвращает словарь {слаг: id} из кэша справочника тегов."""
+    return versioned_cache.get_or_build(
+        "tags", "ids_by_slug",
+        lambda: dict(Tags.objects.values_list("slug", "id")),
+    )
+
+
+class IngredientsSearchFilter(BaseFilterBackend):
+    """Автодополнение ингредиента по имени.
+
+    Сначала ищет совпадения по началу названия, затем по вхождению,
+    а на PostgreSQL - похожие названия с опечатками. Каждый этап
+    ограничен оставшимся до INGREDIENTS_SEARCH_LIMIT количеством.
+    """
     search_param = "name"
 
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, "action", None) != "list":
+            return queryset
+        limit = settings.INGREDIENTS_SEARCH_LIMIT
+        name = request.query_params.get(self.search_param, "").strip()
+        if not name:
+            return queryset[:limit]
+        name = name.lower()
+        queryset = queryset.annotate(lower_name=Lower("name"))
+        results = list(
+            queryset.filter(lower_name__startswith=name)[:limit]
+        )
+        if len(results) < limit:
+            results += queryset.filter(lower_name__contains=name).exclude(
+                lower_name__startswith=name,
+            )[:limit - len(results)]
+        if len(results) < limit and connection.vendor == "postgresql":
+            results += self.similar(
+                queryset, name, [obj.id for obj in results],
+                limit - len(results),
+            )
+        return results
+
+    @staticmethod
+    def similar(queryset, name, exclude_ids, limit):
+        """Названия, похожие на запрос по триграммам.
+
+        Отбор выполняется оператором %, который использует GIN-индекс
+        по LOWER(name). Порог сходства задается через SET LOCAL и
+        действует только до конца транзакции, в которой читается
+        результат.
+        """
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SET LOCAL pg_trgm.similarity_threshold = %s",
+                    (settings.INGREDIENTS_TRIGRAM_SIMILARITY,),
+                )
+            return list(
+                queryset.filter(lower_name__trigram_similar=name)
+                .exclude(id__in=exclude_ids)
+                .annotate(similarity=TrigramSimilarity("lower_name", name))
+                .order_by("-similarity", "name")[:limit]
+            )
+
+
+class TagsSlugFilter(MultipleChoiceFilter):
+    """Фильтрация по слагам тегов.
+
+    Допустимые слаги берутся из кэша справочника, а отбор выполняется
+    подзапросом EXISTS, поэтому рецепты не дублируются и DISTINCT
+    не нужен.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("distinct", False)
+        super().__init__(*args, **kwargs)
+
+    @property
+    def field(self):
+        self.extra["choices"] = [
+            (slug, slug) for slug in get_tag_ids_by_slug()
+        ]
+        return super().field
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        ids_by_slug = get_tag_ids_by_slug()
+        return qs.filter(Exists(RecipeTags.objects.filter(
+            recipe=OuterRef("pk"),
+            tag_id__in=[ids_by_slug[slug] for slug in value],
+        )))
+
 
 class RecipesFilter(FilterSet):
     """Фильтр рецепта."""
-    tags = AllValuesMultipleFilter(
-        field_name="tags__slug",
-    )
+    tags = TagsSlugFilter()
     is_favorited = BooleanFilter(
         method="filter_is_favorited",
     )
     is_in_shopping_cart = BooleanFilter(
         method="filter_is_in_shopping_cart",
     )
+    search = CharFilter(method="filter_search")
 
     class Meta:
         model = Recipes
         fields = ("tags", "author", "is_favorited", "is_in_shopping_cart")
 
+    def filter_user_list(self, queryset, model, value):
+        """Оставляет рецепты из списка пользователя подзапросом EXISTS."""
+        if not value:
+            return queryset
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.none()
+        return queryset.filter(Exists(model.objects.filter(
+            user=user, recipe=OuterRef("pk"),
+        )))
+
     def filter_is_favorited(self, queryset, name, value):
         """Фильтрация рецептов в избранном."""
-        if value:
-            return queryset.filter(
-                favorite_list_recipe__user=self.request.user)
-        return queryset
+        return self.filter_user_list(queryset, FavoriteList, value)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         """Фильтрация рецептов в списке покупок."""
-        if value:
-            return queryset.filter(
-                shopping_cart_recipe__user=self.request.user)
-        return queryset
+        return self.filter_user_list(queryset, ShoppingCart, value)
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию, описанию и ингредиентам.
+
+        На PostgreSQL используется search_vector, на других базах
+        данных - индекс в памяти процесса.
+        """
+        if connection.vendor == "postgresql":
+            return queryset.search(value)
+        ranks = recipe_search_index.search(value)
+        return queryset.filter(pk__in=ranks).annotate(search_rank=Case(
+            *(When(pk=pk, then=Value(rank)) for pk, rank in ranks.items()),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ))
+
+
+class RecipesOrderingFilter(OrderingFilter):
+    """Без параметра ordering результаты поиска идут по релевантности.
+
+    Сортировка по умолчанию дописывается в конец любой сортировки,
+    чтобы порядок страниц был однозначным.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        default_ordering = tuple(self.get_default_ordering(view) or ())
+        if (self.ordering_param not in request.query_params
+                and "search_rank" in queryset.query.annotations):
+            ordering = ("-search_rank",)
+        else:
+            ordering = tuple(
+                super().get_ordering(request, queryset, view) or ())
+        fields = {field.lstrip("-") for field in ordering}
+        return ordering + tuple(
+            field for field in default_ordering
+            if field.lstrip("-") not in fields
+        )
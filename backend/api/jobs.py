@@ -0,0 +1,103 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils import timezone
+
+from recipes.models import ShoppingListJob
+from .reports import (
+    get_shopping_list_pdf,
+    shopping_list_digest,
+    shopping_list_rows
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_FILES_DIR = ShoppingListJob.file.field.upload_to
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    """Пул потоков процесса для фоновой генерации файлов."""
+    return ThreadPoolExecutor(
+        max_workers=settings.SHOPPING_LIST_JOB_WORKERS,
+        thread_name_prefix="shopping-list",
+    )
+
+
+def enqueue_shopping_list_job(user):
+    """Создает задачу и отправляет ее в пул после фиксации транзакции."""
+    job = ShoppingListJob.objects.create(user=user)
+    transaction.on_commit(lambda: get_executor().submit(run_job, job.pk))
+    return job
+
+
+def save_shopping_list(job):
+    """Сохраняет PDF задачи в файл с именем по хэшу списка покупок.
+
+    Одинаковые списки покупок используют один файл.
+    """
+    rows = [tuple(row) for row in shopping_list_rows(job.user)]
+    name = f"{JOB_FILES_DIR}/{shopping_list_digest(rows)}.pdf"
+    storage = job.file.storage
+    if not storage.exists(name):
+        name = storage.save(name, ContentFile(get_shopping_list_pdf(rows)))
+    job.file.name = name
+
+
+def run_job(job_id):
+    """Формирует PDF и сохраняет его в хранилище медиафайлов."""
+    try:
+        updated = ShoppingListJob.objects.filter(
+            pk=job_id, status=ShoppingListJob.PENDING,
+        ).update(status=ShoppingListJob.RUNNING)
+        if not updated:
+            return
+        job = ShoppingListJob.objects.select_related("user").get(pk=job_id)
+        try:
+            save_shopping_list(job)
+            job.status = ShoppingListJob.DONE
+        except Exception:
+            logger.exception("Не удалось сформировать список покупок")
+            job.status = ShoppingListJob.FAILED
+        job.save(update_fields=("file", "status"))
+    finally:
+        connections.close_all()
+
+
+def requeue_stale_jobs():
+    """Возвращает в очередь задачи, зависшие после перезапуска процесса."""
+    return ShoppingListJob.objects.filter(
+        status=ShoppingListJob.RUNNING,
+        created__lt=timezone.now() - timedelta(
+            seconds=settings.SHOPPING_LIST_JOB_TIMEOUT),
+    ).update(status=ShoppingListJob.PENDING)
+
+
+def delete_expired_jobs():
+    """Удаляет задачи старше SHOPPING_LIST_JOB_TTL и их файлы.
+
+    Файл удаляется, только если на него не ссылаются оставшиеся задачи
+    и он сам старше срока хранения.
+    """
+    expired_before = timezone.now() - timedelta(
+        seconds=settings.SHOPPING_LIST_JOB_TTL)
+    deleted, _ = ShoppingListJob.objects.filter(
+        created__lt=expired_before,
+    ).delete()
+    storage = ShoppingListJob.file.field.storage
+    if not storage.exists(JOB_FILES_DIR):
+        return deleted
+    used = set(ShoppingListJob.objects.exclude(file="").values_list(
+        "file", flat=True))
+    for file_name in storage.listdir(JOB_FILES_DIR)[1]:
+        name = os.path.join(JOB_FILES_DIR, file_name)
+        if (name not in used
+                and storage.get_modified_time(name) < expired_before):
+            storage.delete(name)
+    return deleted
@@ -0,0 +1,89 @@
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from api.benchmark import SyntheticDataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Замерить количество SQL-запросов и время ответа эндпоинтов API "
+        "на синтетических данных. Данные создаются в отдельной тестовой "
+        "базе, которая удаляется после замера. Бюджеты SQL-запросов "
+        "проверяются тестами в tests/test_queries.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument("--recipes", type=int, default=5000)
+        parser.add_argument("--follows", type=int, default=20,
+                            help="Подписок на пользователя")
+        parser.add_argument("--favorites", type=int, default=20,
+                            help="Рецептов в избранном на пользователя")
+        parser.add_argument("--carts", type=int, default=10,
+                            help="Рецептов в списке покупок на пользователя")
+        parser.add_argument("--repeat", type=int, default=3,
+                            help="Количество повторов каждого запроса")
+        parser.add_argument("--time-budget", type=float, default=None,
+                            help="Максимальное время ответа, мс")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        dataset = SyntheticDataset(self.stdout, options["seed"])
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+        )
+        try:
+            with tempfile.TemporaryDirectory() as media_root:
+                with override_settings(MEDIA_ROOT=media_root):
+                    dataset.create(
+                        options["users"], options["recipes"],
+                        options["follows"], options["favorites"],
+                        options["carts"],
+                    )
+                    results = self.run_endpoints(dataset, options["repeat"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        self.report(results, options["time_budget"])
+
+    @staticmethod
+    def run_endpoints(dataset, repeat):
+        """Выполняет запросы к эндпоинтам и собирает статистику."""
+        results = []
+        dataset.warm_up()
+        for name, prepare, request in dataset.endpoints():
+            queries, timing, responses = dataset.measure(prepare, request,
+                                                         repeat)
+            for response in responses:
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f"{name}: ответ {response.status_code} "
+                        f"{getattr(response, 'data', '')}"
+                    )
+            results.append((name, queries, timing))
+        return results
+
+    def report(self, results, time_budget):
+        """Выводит таблицу результатов и проверяет бюджет времени."""
+        failures = []
+        self.stdout.write(f"{'Эндпоинт':<34}{'Запросы':>8}"
+                          f"{'Время, мс':>12}")
+        for name, queries, timing in results:
+            line = f"{name:<34}{queries:>8}{timing:>12.1f}"
+            if time_budget is not None and timing > time_budget:
+                failures.append(f"{name}: {timing:.1f} мс > {time_budget} мс")
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        if failures:
+            raise CommandError(
+                "Превышен бюджет времени:\n" + "\n".join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS("Бюджет времени соблюден"))
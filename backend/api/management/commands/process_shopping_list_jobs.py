@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.jobs import delete_expired_jobs, requeue_stale_jobs, run_job
+from recipes.models import ShoppingListJob
+
+
+class Command(BaseCommand):
+    help = ('Выполнить задачи выгрузки списков покупок, оставшиеся в '
+            'очереди или зависшие после перезапуска сервера, и удалить '
+            'устаревшие задачи с файлами')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        job_ids = list(
+            ShoppingListJob.objects.filter(status=ShoppingListJob.PENDING)
+            .order_by("created")
+            .values_list("pk", flat=True)
+        )
+        for job_id in job_ids:
+            run_job(job_id)
+        deleted = delete_expired_jobs()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано задач: {len(job_ids)}, '
+            f'возвращено в очередь: {requeued}, удалено: {deleted}'))
@@ -1,15 +1,40 @@
+from functools import lru_cache
+
 import pymorphy2
+from django.conf import settings
+from django.db import DatabaseError
+
+
+@lru_cache(maxsize=None)
+def get_morph_analyzer():
+    """Возвращает общий для процесса морфологический анализатор."""
+    return pymorphy2.MorphAnalyzer()
+
+
+@lru_cache(maxsize=settings.DECLINATION_CACHE_SIZE)
+def inflect_unit(name_ingredient, plural):
+    """Склоняет единицу измерения в единственное или множественное число."""
+    parsed = get_morph_analyzer().parse(name_ingredient)[0]
+    inflected = parsed.inflect({'plur'} if plural else {'sing'})
+
+    if inflected is None:
+        return name_ingredient
+    return inflected.word
 
 
 def declination_ingredients(name_ingredient, amount):
     """Склонение количества ингредиентов."""
-    morph = pymorphy2.MorphAnalyzer()
+    return inflect_unit(name_ingredient, amount != 1)
 
-    parsed = morph.parse(name_ingredient)[0]
 
-    if amount == 1:
-        inflected_word = parsed.inflect({'sing'}).word
-    else:
-        inflected_word = parsed.inflect({'plur'}).word
+def warm_up_declinations(**kwargs):
+    """Заранее склоняет все единицы измерения из базы данных."""
+    from recipes.models import MeasureUnits
 
-    return inflected_word
+    try:
+        names = list(MeasureUnits.objects.values_list("name", flat=True))
+    except DatabaseError:
+        return
+    for name in names:
+        inflect_unit(name, False)
+        inflect_unit(name, True)
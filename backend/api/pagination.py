@@ -1,6 +1,87 @@
-from rest_framework.pagination import PageNumberPagination
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination
+)
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     """Пагинация по лимиту на странице."""
     page_size_query_param = "limit"
+
+
+class RecipesCursorPagination(CursorPagination):
+    """Курсорная пагинация рецептов по дате публикации."""
+    page_size_query_param = "limit"
+    ordering = ("-pub_date", "-id")
+
+
+class SubscriptionsCursorPagination(CursorPagination):
+    """Курсорная пагинация подписок от новых к старым."""
+    page_size_query_param = "limit"
+    ordering = ("-subscription_id",)
+
+
+class FeedCursorPagination(CursorPagination):
+    """Курсорная пагинация ленты подписок.
+
+    Страница запрашивается у recipes.feeds.Timeline, позиция курсора -
+    дата публикации и id последнего рецепта страницы. Возвращает id
+    рецептов страницы.
+    """
+    page_size_query_param = "limit"
+
+    def decode_position(self, request):
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            return None
+        try:
+            pub_date, recipe_id = self.cursor.position.split("|")
+            return datetime.fromisoformat(pub_date), int(recipe_id)
+        except (AttributeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, timeline, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        entries = timeline.page(self.decode_position(request),
+                                self.page_size + 1)
+        self.has_next = len(entries) > self.page_size
+        self.page = entries[:self.page_size]
+        return [recipe_id for _, recipe_id in self.page]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        pub_date, recipe_id = self.page[-1]
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False,
+            position=f"{pub_date.isoformat()}|{recipe_id}",
+        ))
+
+    def get_previous_link(self):
+        return None
+
+
+class CursorPaginationMixin:
+    """Включает курсорную пагинацию по параметру pagination=cursor.
+
+    Ссылки next/previous сохраняют параметры запроса, поэтому режим
+    остается включенным при переходе по страницам. Без параметра
+    используется обычный pagination_class.
+    """
+    cursor_pagination_class = None
+    cursor_query_param = "pagination"
+
+    @property
+    def paginator(self):
+        if (not hasattr(self, "_paginator")
+                and self.cursor_pagination_class is not None
+                and self.request.query_params.get(
+                    self.cursor_query_param) == "cursor"):
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
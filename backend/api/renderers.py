@@ -0,0 +1,39 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class PassthroughRenderer(BaseRenderer):
+    """Рендерер для ответов, которые формируются в самом представлении.
+
+    Нужен только для согласования формата по Accept и ?format=.
+    Ошибки рендерятся как JSON.
+    """
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, str)):
+            return data
+        return JSONRenderer().render(data)
+
+
+class PDFRenderer(PassthroughRenderer):
+    media_type = "application/pdf"
+    format = "pdf"
+
+
+class PlainTextRenderer(PassthroughRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+
+class CSVRenderer(PassthroughRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+# PDF идет первым и остается форматом по умолчанию.
+SHOPPING_LIST_RENDERERS = (
+    PDFRenderer,
+    PlainTextRenderer,
+    CSVRenderer,
+    JSONRenderer,
+)
@@ -1,42 +1,204 @@
+import csv
+import hashlib
 import io
+import json
+import os
+from functools import lru_cache
 
-from django.http import FileResponse
+from django.core.cache import cache
+from django.http import FileResponse, StreamingHttpResponse
 from django.conf import settings
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen.canvas import Canvas
 
+from recipes.models import ShoppingCartIngredients
 from .numbers import declination_ingredients
 
+FONT_NAME = "Ostrovsky"
 
-def create_recipe_shopping_list(response):
-    """Создание файла с ингредиентами для рецепта."""
+
+@lru_cache(maxsize=None)
+def register_fonts():
+    """Регистрирует шрифты один раз на процесс."""
+    pdfmetrics.registerFont(TTFont(FONT_NAME, settings.SHOPPING_LIST_FONT))
+
+
+def shopping_list_rows(user):
+    """Строки списка покупок: (название, единица, количество)."""
+    return (
+        ShoppingCartIngredients.objects.filter(user=user)
+        .values_list(
+            "ingredient__name",
+            "ingredient__measurement_unit__name",
+            "amount",
+        )
+        .order_by("ingredient__name")
+    )
+
+
+def format_line(count, name, unit, amount):
+    """Строка списка покупок вида '1. Мука - 200 граммов'."""
+    return (f"{count}. {name.capitalize()} - {amount} "
+            f"{declination_ingredients(unit, amount)}")
+
+
+def draw_footer(canvas):
+    """Рисует подпись внизу страницы."""
+    canvas.setFont(FONT_NAME, settings.FONT_SIZE_12)
+    canvas.drawString(settings.TEXT_HORIZONTAL_CENTER,
+                      settings.PAGE_FOOTER_POSITION,
+                      "Твой продуктовый помощник")
+
+
+def render_shopping_list(ingredients):
+    """Формирует PDF со списком покупок и возвращает его содержимое."""
+    register_fonts()
     buffer = io.BytesIO()
     canvas = Canvas(buffer, pagesize=A4)
-    pdfmetrics.registerFont(TTFont("Ostrovsky", "fonts/Ostrovsky.ttf"))
-    canvas.setFont("Ostrovsky", settings.FONT_SIZE_18)
+    canvas.setFont(FONT_NAME, settings.FONT_SIZE_18)
     canvas.drawString(settings.TEXT_HORIZONTAL_CENTER,
                       settings.TEXT_DIAGONAL_POSITION,
                       "Список покупок:")
-    canvas.setFont("Ostrovsky", settings.FONT_SIZE_14)
+    canvas.setFont(FONT_NAME, settings.FONT_SIZE_14)
     start_pos = settings.LINE_HEIGHT
-    for count, ingredient in enumerate(response, start=1):
-        ingredient_amount = ingredient[2]
-        ingredient_type = ingredient[1]
+    for count, (name, unit, amount) in enumerate(ingredients, start=1):
+        if start_pos < settings.PAGE_BOTTOM_MARGIN:
+            draw_footer(canvas)
+            canvas.showPage()
+            canvas.setFont(FONT_NAME, settings.FONT_SIZE_14)
+            start_pos = settings.TEXT_DIAGONAL_POSITION
         canvas.drawString(
-            50,
-            start_pos,
-            f"{count}. {ingredient[0].capitalize()} - {ingredient_amount} "
-            f"{declination_ingredients(ingredient_type, ingredient_amount)}",
+            50, start_pos, format_line(count, name, unit, amount),
         )
         start_pos -= settings.LINE_HEIGHT_INCREMENT
-    canvas.setFont("Ostrovsky", settings.FONT_SIZE_12)
-    canvas.drawString(settings.TEXT_HORIZONTAL_CENTER, 30,
-                      "Твой продуктовый помощник")
+    draw_footer(canvas)
 
     canvas.showPage()
     canvas.save()
-    buffer.seek(0)
-    return FileResponse(buffer, as_attachment=True,
-                        filename=settings.RECIPE_SHOPPING_LIST)
+    return buffer.getvalue()
+
+
+def shopping_list_digest(ingredients):
+    """Хэш содержимого списка покупок."""
+    ingredients = [tuple(ingredient) for ingredient in ingredients]
+    return hashlib.sha256(repr(ingredients).encode()).hexdigest()
+
+
+def get_shopping_list_pdf(ingredients):
+    """Возвращает PDF из кэша по хэшу содержимого списка покупок."""
+    ingredients = [tuple(ingredient) for ingredient in ingredients]
+    key = f"shopping_list_pdf:{shopping_list_digest(ingredients)}"
+    content = cache.get(key)
+    if content is None:
+        content = render_shopping_list(ingredients)
+        cache.set(key, content, settings.SHOPPING_LIST_CACHE_TIMEOUT)
+    return content
+
+
+class Echo:
+    """Буфер, который сразу возвращает записанное значение."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListExporter:
+    """Базовый класс выгрузки списка покупок.
+
+    ingredients - queryset из кортежей (название, единица, количество).
+    """
+    format = None
+    media_type = None
+
+    def get_filename(self):
+        base_name, _ = os.path.splitext(settings.RECIPE_SHOPPING_LIST)
+        return f"{base_name}.{self.format}"
+
+    def export(self, ingredients):
+        raise NotImplementedError
+
+    def stream(self, chunks):
+        response = StreamingHttpResponse(
+            chunks, content_type=f"{self.media_type}; charset=utf-8",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{self.get_filename()}"'
+        )
+        return response
+
+    @staticmethod
+    def iterate(ingredients):
+        """Читает строки серверным курсором порциями."""
+        return ingredients.iterator(
+            chunk_size=settings.SHOPPING_LIST_CHUNK_SIZE,
+        )
+
+
+class PdfExporter(ShoppingListExporter):
+    format = "pdf"
+    media_type = "application/pdf"
+
+    def export(self, ingredients):
+        return FileResponse(io.BytesIO(get_shopping_list_pdf(ingredients)),
+                            as_attachment=True,
+                            filename=settings.RECIPE_SHOPPING_LIST)
+
+
+class TextExporter(ShoppingListExporter):
+    format = "txt"
+    media_type = "text/plain"
+
+    def export(self, ingredients):
+        def lines():
+            yield "Список покупок:\n"
+            for count, row in enumerate(self.iterate(ingredients), start=1):
+                yield format_line(count, *row) + "\n"
+
+        return self.stream(lines())
+
+
+class CsvExporter(ShoppingListExporter):
+    format = "csv"
+    media_type = "text/csv"
+
+    def export(self, ingredients):
+        writer = csv.writer(Echo())
+
+        def rows():
+            yield writer.writerow(("name", "measurement_unit", "amount"))
+            for row in self.iterate(ingredients):
+                yield writer.writerow(row)
+
+        return self.stream(rows())
+
+
+class JsonExporter(ShoppingListExporter):
+    format = "json"
+    media_type = "application/json"
+
+    def export(self, ingredients):
+        def items():
+            yield "["
+            for number, (name, unit, amount) in enumerate(
+                    self.iterate(ingredients)):
+                yield ("," if number else "") + json.dumps(
+                    {"name": name, "measurement_unit": unit,
+                     "amount": amount},
+                    ensure_ascii=False,
+                )
+            yield "]"
+
+        return self.stream(items())
+
+
+EXPORTERS = {
+    exporter.format: exporter
+    for exporter in (PdfExporter, TextExporter, CsvExporter, JsonExporter)
+}
+
+
+def create_recipe_shopping_list(ingredients, export_format="pdf"):
+    """Создание файла с ингредиентами для рецепта в нужном формате."""
+    return EXPORTERS[export_format]().export(ingredients)
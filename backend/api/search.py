@@ -0,0 +1,378 @@
+import re
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from recipes.models import RecipeIngredients, Recipes
+from .cache import versioned_cache
+from .numbers import get_morph_analyzer
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Веса полей совпадают с весами A, B и C в SearchRank PostgreSQL.
+NAME_WEIGHT = 1.0
+INGREDIENTS_WEIGHT = 0.4
+TEXT_WEIGHT = 0.2
+
+
+@lru_cache(maxsize=settings.DECLINATION_CACHE_SIZE)
+def normalize(word):
+    """Нормальная форма слова: 'томатами' -> 'томат'."""
+    return get_morph_analyzer().parse(word)[0].normal_form
+
+
+def tokenize(text):
+    return {normalize(word) for word in WORD_PATTERN.findall(text.lower())}
+
+
+class ProcessIndex:
+    """Индекс в памяти процесса с номером версии в общем кэше.
+
+    apply() читает актуальное состояние из базы, поэтому изменения
+    из журнала можно применять повторно.
+    """
+    namespace = None
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def apply(self, *args):
+        raise NotImplementedError
+
+    def change_key(self, version):
+        return f"{self.namespace}:changes:{version}"
+
+    def changes(self, version):
+        """Изменения после текущей версии индекса до version.
+
+        Возвращает None, если журнал неполон.
+        """
+        if (self._version is None or not 0 < version - self._version
+                <= settings.INDEX_CHANGE_LOG_SIZE):
+            return None
+        keys = [
+            self.change_key(number)
+            for number in range(self._version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return None
+        return [changes[key] for key in keys]
+
+    def _ensure_fresh(self):
+        version = versioned_cache.version(self.namespace)
+        if version == self._version:
+            return
+        changes = self.changes(version)
+        if changes is None:
+            self.rebuild()
+        else:
+            for change in changes:
+                self.apply(*change)
+        self._version = version
+
+    def publish(self, change):
+        """Записывает изменение в журнал и увеличивает версию индекса.
+
+        Номер изменения занимается через cache.add, поэтому номера
+        изменений из разных процессов идут подряд.
+        """
+        version = versioned_cache.version(self.namespace) + 1
+        while not cache.add(self.change_key(version), change,
+                            settings.CACHE_TIMEOUT):
+            version += 1
+        versioned_cache.invalidate(self.namespace)
+
+    def update(self, *args):
+        """Публикует изменение после фиксации текущей транзакции."""
+        transaction.on_commit(lambda: self.publish(args))
+
+
+class RecipeSearchIndex(ProcessIndex):
+    """Инвертированный индекс слов рецептов.
+
+    Используется вместо полнотекстового поиска PostgreSQL на других базах
+    данных.
+    """
+    namespace = "recipe_search"
+
+    def __init__(self):
+        super().__init__()
+        self._postings = defaultdict(dict)
+        self._tokens = {}
+
+    @staticmethod
+    def documents(recipe_ids=None):
+        """Возвращает {id рецепта: [(текст, вес), ...]}."""
+        recipes = Recipes.objects.all()
+        links = RecipeIngredients.objects.all()
+        if recipe_ids is not None:
+            recipes = recipes.filter(pk__in=recipe_ids)
+            links = links.filter(recipe_id__in=recipe_ids)
+        documents = {
+            pk: [(name, NAME_WEIGHT), (text, TEXT_WEIGHT)]
+            for pk, name, text in recipes.values_list("pk", "name", "text")
+        }
+        for recipe_id, name in links.values_list("recipe_id",
+                                                 "ingredient__name"):
+            if recipe_id in documents:
+                documents[recipe_id].append((name, INGREDIENTS_WEIGHT))
+        return documents
+
+    def _remove(self, recipe_id):
+        for token in self._tokens.pop(recipe_id, ()):
+            self._postings[token].pop(recipe_id, None)
+            if not self._postings[token]:
+                del self._postings[token]
+
+    def _add(self, recipe_id, fields):
+        weights = {}
+        for text, weight in fields:
+            for token in tokenize(text):
+                weights[token] = max(weights.get(token, 0), weight)
+        for token, weight in weights.items():
+            self._postings[token][recipe_id] = weight
+        self._tokens[recipe_id] = set(weights)
+
+    def rebuild(self):
+        self._postings.clear()
+        self._tokens.clear()
+        for recipe_id, fields in self.documents().items():
+            self._add(recipe_id, fields)
+
+    def apply(self, recipe_ids):
+        """Переиндексирует рецепты; удаленные рецепты убираются."""
+        documents = self.documents(recipe_ids)
+        for recipe_id in recipe_ids:
+            self._remove(recipe_id)
+            if recipe_id in documents:
+                self._add(recipe_id, documents[recipe_id])
+
+    def search(self, query):
+        """Возвращает {id рецепта: ранг} для рецептов со всеми словами."""
+        tokens = tokenize(query)
+        if not tokens:
+            return {}
+        with self._lock:
+            self._ensure_fresh()
+            postings = sorted(
+                (self._postings.get(token, {}) for token in tokens), key=len,
+            )
+            recipe_ids = set(postings[0]).intersection(*postings[1:])
+            return {
+                recipe_id: sum(posting[recipe_id] for posting in postings)
+                for recipe_id in recipe_ids
+            }
+
+
+def popcount(mask):
+    """Количество единичных битов маски.
+
+    int.bit_count() появился только в Python 3.10.
+    """
+    return bin(mask).count("1")
+
+
+def to_mask(recipe_ids):
+    """Битовая маска (int) из отсортированного массива id рецептов."""
+    if isinstance(recipe_ids, int):
+        return recipe_ids
+    if not recipe_ids:
+        return 0
+    bits = bytearray((recipe_ids[-1] >> 3) + 1)
+    for recipe_id in recipe_ids:
+        bits[recipe_id >> 3] |= 1 << (recipe_id & 7)
+    return int.from_bytes(bits, "little")
+
+
+def drop_highest_bits(mask, count):
+    """Сбрасывает count старших единичных битов маски."""
+    low, high = 0, mask.bit_length()
+    while low < high:
+        middle = (low + high) // 2
+        if popcount(mask >> middle) <= count:
+            high = middle
+        else:
+            low = middle + 1
+    return mask & ((1 << low) - 1)
+
+
+class RankedMatches:
+    """Рецепты по убыванию доли имеющихся ингредиентов.
+
+    Элементы среза - кортежи (id рецепта, найдено, всего ингредиентов).
+    """
+
+    def __init__(self, masks, by_size):
+        self.counter = []
+        for mask in masks:
+            carry = mask
+            for position, digit in enumerate(self.counter):
+                if not carry:
+                    break
+                self.counter[position], carry = digit ^ carry, digit & carry
+            if carry:
+                self.counter.append(carry)
+        self.by_size = by_size
+        self.max_count = len(masks)
+        width = max(
+            (mask.bit_length() for mask in (*by_size.values(), *self.counter)),
+            default=0,
+        )
+        self.full = (1 << width) - 1
+
+    def with_count(self, count):
+        """Маска рецептов, в которых найдено ровно count ингредиентов."""
+        if count >> len(self.counter):
+            # Счетчик не достигает count ни для одного рецепта.
+            return 0
+        mask = self.full
+        for position, digit in enumerate(self.counter):
+            mask &= digit if count >> position & 1 else self.full ^ digit
+        return mask
+
+    def levels(self):
+        levels = sorted(
+            (
+                (count, size) for size in self.by_size
+                for count in range(1, min(size, self.max_count) + 1)
+            ),
+            key=lambda level: (level[0] / level[1], level[0]),
+            reverse=True,
+        )
+        masks = {}
+        for count, size in levels:
+            if count not in masks:
+                masks[count] = self.with_count(count)
+            yield count, size, masks[count] & self.by_size[size]
+
+    def __len__(self):
+        found = 0
+        for digit in self.counter:
+            found |= digit
+        alive = 0
+        for mask in self.by_size.values():
+            alive |= mask
+        return popcount(found & alive)
+
+    def __getitem__(self, page):
+        skip, results = page.start or 0, []
+        for count, size, mask in self.levels():
+            total = popcount(mask)
+            if skip >= total:
+                skip -= total
+                continue
+            mask = drop_highest_bits(mask, skip)
+            skip = 0
+            while mask and len(results) < page.stop - (page.start or 0):
+                recipe_id = mask.bit_length() - 1
+                mask ^= 1 << recipe_id
+                results.append((recipe_id, count, size))
+            if len(results) >= page.stop - (page.start or 0):
+                break
+        return results
+
+
+class IngredientIndex(ProcessIndex):
+    """Обратный индекс ингредиент -> рецепты.
+
+    Рецепты ингредиента хранятся массивом id или битовой маской -
+    тем, что занимает меньше памяти.
+    """
+    namespace = "recipe_ingredients"
+
+    def __init__(self):
+        super().__init__()
+        self._recipes = {}
+        self._sizes = array("H")
+        self._by_size = {}
+
+    def rebuild(self):
+        max_id = Recipes.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+        recipes = defaultdict(lambda: array("l"))
+        sizes = array("H", [0]) * (max_id + 1)
+        rows = RecipeIngredients.objects.filter(
+            recipe_id__lte=max_id,
+        ).order_by("ingredient_id", "recipe_id").values_list(
+            "ingredient_id", "recipe_id",
+        )
+        for ingredient_id, recipe_id in rows.iterator(
+                chunk_size=settings.INGREDIENT_INDEX_CHUNK_SIZE):
+            recipes[ingredient_id].append(recipe_id)
+            sizes[recipe_id] += 1
+        by_size = defaultdict(lambda: bytearray((max_id >> 3) + 1))
+        for recipe_id, size in enumerate(sizes):
+            if size:
+                by_size[size][recipe_id >> 3] |= 1 << (recipe_id & 7)
+        self._recipes = {
+            ingredient_id: (to_mask(recipe_ids)
+                            if len(recipe_ids) * 64 > max_id else recipe_ids)
+            for ingredient_id, recipe_ids in recipes.items()
+        }
+        self._sizes = sizes
+        self._by_size = {
+            size: int.from_bytes(bits, "little")
+            for size, bits in by_size.items()
+        }
+
+    def apply(self, recipe_id, ingredient_ids):
+        """Приводит индекс в соответствие с составом рецепта в базе.
+
+        ingredient_ids - ингредиенты, которые могли быть добавлены
+        или удалены.
+        """
+        current = set(RecipeIngredients.objects.filter(
+            recipe_id=recipe_id,
+        ).values_list("ingredient_id", flat=True))
+        bit = 1 << recipe_id
+        for ingredient_id in ingredient_ids:
+            recipes = self._recipes.get(ingredient_id, array("l"))
+            if isinstance(recipes, int):
+                recipes = (recipes | bit if ingredient_id in current
+                           else recipes & ~bit)
+            else:
+                position = bisect_left(recipes, recipe_id)
+                present = (position < len(recipes)
+                           and recipes[position] == recipe_id)
+                if ingredient_id in current and not present:
+                    recipes.insert(position, recipe_id)
+                elif ingredient_id not in current and present:
+                    del recipes[position]
+            self._recipes[ingredient_id] = recipes
+        if recipe_id >= len(self._sizes):
+            self._sizes.extend([0] * (recipe_id + 1 - len(self._sizes)))
+        old_size, new_size = self._sizes[recipe_id], len(current)
+        if old_size:
+            self._by_size[old_size] &= ~bit
+        if new_size:
+            self._by_size[new_size] = self._by_size.get(new_size, 0) | bit
+        self._sizes[recipe_id] = new_size
+
+    def match(self, ingredient_ids):
+        """Рецепты хотя бы с одним из ингредиентов в виде RankedMatches."""
+        with self._lock:
+            self._ensure_fresh()
+            masks = [
+                to_mask(self._recipes[ingredient_id])
+                for ingredient_id in ingredient_ids
+                if ingredient_id in self._recipes
+            ]
+            by_size = {
+                size: mask for size, mask in self._by_size.items() if mask
+            }
+        return RankedMatches(masks, by_size)
+
+
+recipe_search_index = RecipeSearchIndex()
+ingredient_index = IngredientIndex()
@@ -1,19 +1,27 @@
-from drf_extra_fields.fields import Base64ImageField
+from collections import Counter
+
 from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework.generics import get_object_or_404
 from rest_framework.validators import UniqueTogetherValidator
 
 from recipes.models import (
     FavoriteList,
     Ingredients,
     RecipeIngredients,
+    RecipeTags,
     Recipes,
     ShoppingCart,
+    ShoppingCartIngredients,
+    ShoppingListJob,
     Tags
 )
+from recipes.signals import recipe_ingredients_changed
 from users.serializers import CustomUserSerializer
+from .fields import RecipeImageField
+from .fieldsets import IdListField, SparseFieldsetMixin
 
 
 class TagsSerializer(serializers.ModelSerializer):
@@ -46,14 +54,43 @@ class RecipeIngredientsSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
-class RecipesSerializer(serializers.ModelSerializer):
+class ShoppingCartIngredientsSerializer(serializers.ModelSerializer):
+    """Сериализатор сводного списка покупок."""
+    id = serializers.ReadOnlyField(source="ingredient.id")
+    name = serializers.ReadOnlyField(source="ingredient.name")
+    measurement_unit = serializers.ReadOnlyField(
+        source="ingredient.measurement_unit.name",
+    )
+
+    class Meta:
+        model = ShoppingCartIngredients
+        fields = ("id", "name", "measurement_unit", "amount")
+
+
+class ShoppingListJobSerializer(serializers.ModelSerializer):
+    """Сериализатор задачи фоновой выгрузки списка покупок."""
+    url = serializers.SerializerMethodField()
+    file = serializers.FileField(read_only=True)
+
+    class Meta:
+        model = ShoppingListJob
+        fields = ("id", "status", "url", "file")
+
+    def get_url(self, obj):
+        """Адрес для опроса состояния задачи."""
+        return self.context.get("request").build_absolute_uri(
+            reverse("recipes-shopping-cart-job", kwargs={"job_id": obj.pk})
+        )
+
+
+class RecipesSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Сериализатор для рецепта."""
     tags = TagsSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
     ingredients = serializers.SerializerMethodField(read_only=True)
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipes
@@ -74,14 +111,28 @@ class RecipesSerializer(serializers.ModelSerializer):
             "is_shopping_cart",
         )
 
+    def get_collapsed_fields(self):
+        return {
+            "tags": IdListField("id"),
+            "author": serializers.PrimaryKeyRelatedField(read_only=True),
+            "ingredients": IdListField(
+                "ingredient_id", source="recipeingredients_set",
+            ),
+        }
+
     @staticmethod
     def get_ingredients(obj):
         """Получает список ингредиентов с количеством."""
-        queryset = RecipeIngredients.objects.filter(recipe=obj)
+        queryset = obj.recipeingredients_set.all()
+        if "recipeingredients_set" not in getattr(
+                obj, "_prefetched_objects_cache", {}):
+            queryset = queryset.select_related("ingredient__measurement_unit")
         return RecipeIngredientsSerializer(queryset, many=True).data
 
     def get_is_favorited(self, obj):
         """Проверяет, содержится ли данный рецепт в списке избранного."""
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
@@ -92,12 +143,19 @@ class RecipesSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         """Проверяет, содержится ли данный рецепт в списке покупок."""
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
         return ShoppingCart.objects.filter(user_id=user.id,
                                            recipe_id=obj.id).exists()
 
+    def to_representation(self, instance):
+        if hasattr(instance, "is_author_subscribed"):
+            instance.author.is_subscribed = instance.is_author_subscribed
+        return super().to_representation(instance)
+
     def validate(self, data):
         """Проверяет данные для создания и редактирования рецепта."""
         name = self.initial_data.get("name").strip()
@@ -105,56 +163,116 @@ class RecipesSerializer(serializers.ModelSerializer):
         ingredients = self.initial_data.get("ingredients")
 
         data["name"] = name.capitalize()
-        data["tags"] = self.validate_tags(tags)
-        data["ingredients"] = self.validate_ingredients(ingredients)
+        errors = {}
+        for field, validator, value in (
+            ("tags", self.validate_tags, tags),
+            ("ingredients", self.validate_ingredients, ingredients),
+        ):
+            try:
+                data[field] = validator(value)
+            except ValidationError as error:
+                errors[field] = error.detail
+        if errors:
+            raise ValidationError(errors)
         data["author"] = self.context.get("request").user
         return data
 
+    @staticmethod
+    def find_duplicates(ids):
+        """Возвращает id, которые встречаются больше одного раза."""
+        return [item for item, count in Counter(ids).items() if count > 1]
+
     def validate_tags(self, tags):
-        """Проверяет теги."""
+        """Проверяет теги одним запросом к базе данных."""
         if not isinstance(tags, list):
             raise ValidationError(
                 "Параметр 'tags' не является списком (list)"
             )
-        validated_tags = []
-        for tag in tags:
-            if not Tags.objects.filter(id=tag):
-                raise ValidationError(f"Тег {tag} не существует")
-            validated_tags.append(tag)
-            if tag not in validated_tags:
-                raise ValidationError(f"Тег {tag} уже был передан")
-        return validated_tags
+        errors = [
+            f"Значение {tag} не является id тега"
+            for tag in tags if not str(tag).isdecimal()
+        ]
+        if errors:
+            raise ValidationError(errors)
+        tag_ids = [int(tag) for tag in tags]
+        found = Tags.objects.in_bulk(set(tag_ids))
+        errors = [
+            f"Тег {tag} не существует"
+            for tag in dict.fromkeys(tag_ids) if tag not in found
+        ]
+        errors += [
+            f"Тег {tag} уже был передан"
+            for tag in self.find_duplicates(tag_ids)
+        ]
+        if errors:
+            raise ValidationError(errors)
+        return [found[tag] for tag in tag_ids]
 
     def validate_ingredients(self, ingredients):
-        """Проверяет ингредиенты."""
+        """Проверяет ингредиенты одним запросом к базе данных."""
         if not isinstance(ingredients, list):
             raise ValidationError(
                 "Параметр 'ingredients' не является списком (list)"
             )
+        ingredient_ids = [
+            int(ingredient["id"])
+            if isinstance(ingredient, dict)
+            and str(ingredient.get("id")).isdecimal()
+            else None
+            for ingredient in ingredients
+        ]
+        found = Ingredients.objects.in_bulk(
+            {ingredient_id for ingredient_id in ingredient_ids
+             if ingredient_id is not None}
+        )
+        errors = []
         checked_ingredients = []
-        for ingredient in ingredients:
-            if not Ingredients.objects.filter(id=ingredient.get("id")):
-                raise ValidationError(
-                    f"Ингредиент с 'id' {ingredient.get('id')} не существует"
+        for ingredient, ingredient_id in zip(ingredients, ingredient_ids):
+            if ingredient_id not in found:
+                raw_id = (ingredient.get("id")
+                          if isinstance(ingredient, dict) else ingredient)
+                errors.append(
+                    f"Ингредиент с 'id' {raw_id} не существует"
                 )
+                continue
             amount = ingredient.get("amount")
             if (not str(amount).isdecimal() or not (
                     settings.MIN_POSITIVE_AMOUNT < int(amount)
                     <= settings.MAX_POSITIVE_AMOUNT)):
-                raise ValidationError(
+                errors.append(
                     f"Значение amount '{ingredient.get('amount')}' "
                     "должно быть положительным числом от 1 до 32767"
                 )
+                continue
             checked_ingredients.append(
-                {"id": ingredient.get("id"), "amount": amount},
+                {"ingredient": found[ingredient_id], "amount": int(amount)},
             )
+        errors += [
+            f"Ингредиент с 'id' {ingredient_id} уже был передан"
+            for ingredient_id in self.find_duplicates(
+                ingredient_id for ingredient_id in ingredient_ids
+                if ingredient_id is not None)
+        ]
+        if errors:
+            raise ValidationError(errors)
         return checked_ingredients
 
     @staticmethod
-    def create_tags(tags, recipe):
-        """Создает связь между тегами и рецептом."""
-        for tag in tags:
-            recipe.tags.add(tag)
+    def update_tags(tags, recipe):
+        """Добавляет новые и удаляет лишние теги рецепта."""
+        current_ids = set(
+            RecipeTags.objects.filter(recipe=recipe)
+            .values_list("tag_id", flat=True)
+        )
+        new_ids = {tag.id for tag in tags}
+        if current_ids - new_ids:
+            RecipeTags.objects.filter(
+                recipe=recipe, tag_id__in=current_ids - new_ids,
+            ).delete()
+        RecipeTags.objects.bulk_create(
+            RecipeTags(recipe=recipe, tag_id=tag_id)
+            for tag_id in new_ids - current_ids
+        )
 
     @staticmethod
     def create_ingredients(ingredients, recipe):
@@ -162,13 +280,51 @@ class RecipesSerializer(serializers.ModelSerializer):
         recipe_ingredients = [
             RecipeIngredients(
                 recipe=recipe,
-                ingredient=get_object_or_404(Ingredients, pk=ingredient["id"]),
-                amount=ingredient.get("amount"),
+                ingredient=ingredient["ingredient"],
+                amount=ingredient["amount"],
             )
             for ingredient in ingredients
         ]
         RecipeIngredients.objects.bulk_create(recipe_ingredients)
 
+    def update_ingredients(self, ingredients, recipe):
+        """Применяет к ингредиентам рецепта только необходимые изменения.
+
+        Возвращает id ингредиентов, которые были добавлены, удалены
+        или изменили количество.
+        """
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredients.objects.filter(
+                recipe=recipe)
+        }
+        submitted = {item["ingredient"].id: item for item in ingredients}
+        removed_ids = current.keys() - submitted.keys()
+        if removed_ids:
+            RecipeIngredients.objects.filter(
+                recipe=recipe, ingredient_id__in=removed_ids,
+            ).delete()
+        changed = [
+            current[ingredient_id]
+            for ingredient_id, item in submitted.items()
+            if ingredient_id in current
+            and current[ingredient_id].amount != item["amount"]
+        ]
+        for recipe_ingredient in changed:
+            recipe_ingredient.amount = (
+                submitted[recipe_ingredient.ingredient_id]["amount"]
+            )
+        RecipeIngredients.objects.bulk_update(changed, ["amount"])
+        added = [
+            item for ingredient_id, item in submitted.items()
+            if ingredient_id not in current
+        ]
+        self.create_ingredients(added, recipe)
+        return removed_ids | {
+            recipe_ingredient.ingredient_id for recipe_ingredient in changed
+        } | {item["ingredient"].id for item in added}
+
+    @transaction.atomic
     def create(self, validated_data):
         """Создает рецепт."""
         image = validated_data.pop("image")
@@ -177,19 +333,31 @@ class RecipesSerializer(serializers.ModelSerializer):
         recipe = Recipes.objects.create(image=image, **validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
+        recipe_ingredients_changed.send(
+            sender=Recipes, recipe=recipe,
+            ingredient_ids={item["ingredient"].id for item in ingredients},
+        )
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Редактирует рецепт."""
-        instance.tags.clear()
-        RecipeIngredients.objects.filter(recipe=instance).delete()
-        self.create_tags(validated_data.pop("tags"), instance)
-        self.create_ingredients(validated_data.pop("ingredients"), instance)
+        """Редактирует рецепт, изменяя только отличающиеся связи."""
+        self.update_tags(validated_data.pop("tags"), instance)
+        ingredient_ids = self.update_ingredients(
+            validated_data.pop("ingredients"), instance,
+        )
+        if ingredient_ids:
+            recipe_ingredients_changed.send(
+                sender=Recipes, recipe=instance,
+                ingredient_ids=ingredient_ids,
+            )
         return super().update(instance, validated_data)
 
 
 class RecipesShortSerializer(RecipesSerializer):
     """Сериализатор для сокращенного вывода данных модели Recipes."""
+    image = RecipeImageField(thumbnail=settings.RECIPE_SHORT_THUMBNAIL,
+                             read_only=True)
 
     class Meta:
         model = Recipes
@@ -202,6 +370,19 @@ class RecipesShortSerializer(RecipesSerializer):
         read_only_fields = ("__all__",)
 
 
+class RecipeMatchSerializer(RecipesShortSerializer):
+    """Рецепт с долей имеющихся и списком недостающих ингредиентов."""
+    coverage = serializers.FloatField(read_only=True)
+    missing_ingredients = RecipeIngredientsSerializer(many=True,
+                                                      read_only=True)
+
+    class Meta(RecipesShortSerializer.Meta):
+        fields = RecipesShortSerializer.Meta.fields + (
+            "coverage",
+            "missing_ingredients",
+        )
+
+
 class BaseListSerializer(serializers.ModelSerializer):
     """Общий базовый сериализатор для моделей FavoriteList и ShoppingCart."""
     def to_representation(self, instance):
@@ -0,0 +1,134 @@
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from recipes.models import (
+    FavoriteList,
+    Ingredients,
+    MeasureUnits,
+    RecipeIngredients,
+    Recipes,
+    ShoppingCart,
+    Tags
+)
+from recipes.signals import recipe_ingredients_changed
+from users.models import CustomUser, Follow
+from .cache import versioned_cache
+from .search import ingredient_index, recipe_search_index
+
+# Поля пользователя, которые выводятся в ответах с рецептами.
+PROFILE_FIELDS = ("email", "username", "first_name", "last_name")
+
+
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Tags)
+def invalidate_tags(**kwargs):
+    """Сбрасывает кэш справочника тегов."""
+    versioned_cache.invalidate("tags")
+
+
+@receiver(post_save, sender=Ingredients)
+@receiver(post_delete, sender=Ingredients)
+@receiver(post_save, sender=MeasureUnits)
+@receiver(post_delete, sender=MeasureUnits)
+def invalidate_ingredients(**kwargs):
+    """Сбрасывает кэш справочника ингредиентов."""
+    versioned_cache.invalidate("ingredients")
+
+
+def invalidate_on_commit(namespace):
+    """Сбрасывает кэш после фиксации транзакции.
+
+    Иначе параллельный запрос может успеть закэшировать под новой
+    версией еще не зафиксированные данные.
+    """
+    transaction.on_commit(lambda: versioned_cache.invalidate(namespace))
+
+
+@receiver(post_save, sender=Recipes)
+@receiver(post_delete, sender=Recipes)
+def invalidate_recipe(sender, instance, **kwargs):
+    """Сбрасывает кэш ответов с рецептом."""
+    invalidate_on_commit(f"recipe:{instance.pk}")
+
+
+@receiver(recipe_ingredients_changed)
+def invalidate_recipe_ingredients(sender, recipe, **kwargs):
+    """Сбрасывает кэш ответов с рецептом после изменения состава."""
+    invalidate_on_commit(f"recipe:{recipe.pk}")
+
+
+@receiver(post_save, sender=FavoriteList)
+@receiver(post_delete, sender=FavoriteList)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_user(sender, instance, **kwargs):
+    """Сбрасывает кэш ответов с признаками избранного и подписок."""
+    invalidate_on_commit(f"user:{instance.user_id}")
+
+
+def get_profile_state(user):
+    return tuple(user.__dict__.get(field) for field in PROFILE_FIELDS)
+
+
+@receiver(post_init, sender=CustomUser)
+def remember_profile_state(sender, instance, **kwargs):
+    instance._profile_state = get_profile_state(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_author(sender, instance, created, **kwargs):
+    """Сбрасывает кэш ответов с автором после изменения его профиля.
+
+    Реагирует только на поля, которые выводятся в рецептах.
+    """
+    state = get_profile_state(instance)
+    if created or state == instance._profile_state:
+        return
+    instance._profile_state = state
+    invalidate_on_commit(f"author:{instance.pk}")
+    for recipe_id in Recipes.objects.filter(author=instance).values_list(
+            "pk", flat=True):
+        invalidate_on_commit(f"recipe:{recipe_id}")
+
+
+def reindex_recipes(recipe_ids):
+    """Обновляет индекс поиска рецептов, если нет PostgreSQL."""
+    if connection.vendor != "postgresql":
+        recipe_search_index.update(set(recipe_ids))
+
+
+@receiver(post_save, sender=Recipes)
+@receiver(post_delete, sender=Recipes)
+def reindex_recipe(sender, instance, **kwargs):
+    """Переиндексирует сохраненный или удаленный рецепт."""
+    reindex_recipes([instance.pk])
+
+
+@receiver(recipe_ingredients_changed)
+def reindex_recipe_ingredients(sender, recipe, **kwargs):
+    """Переиндексирует рецепт после изменения состава."""
+    reindex_recipes([recipe.pk])
+
+
+@receiver(post_save, sender=Ingredients)
+def reindex_ingredient_recipes(sender, instance, created, **kwargs):
+    """Переиндексирует рецепты с переименованным ингредиентом."""
+    if not created:
+        reindex_recipes(RecipeIngredients.objects.filter(
+            ingredient=instance,
+        ).values_list("recipe_id", flat=True))
+
+
+@receiver(recipe_ingredients_changed)
+def update_ingredient_index(sender, recipe, ingredient_ids, **kwargs):
+    """Обновляет обратный индекс ингредиентов после изменения рецепта."""
+    ingredient_index.update(recipe.pk, set(ingredient_ids))
+
+
+@receiver(post_delete, sender=Recipes)
+def remove_from_ingredient_index(sender, instance, **kwargs):
+    """Исключает удаленный рецепт из подбора по ингредиентам."""
+    ingredient_index.update(instance.pk, ())
@@ -1,29 +1,62 @@
-from django.db.models import Sum
+import calendar
+import hashlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.http import HttpResponseRedirect, JsonResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers
+)
+from django.utils.http import http_date
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from recipes.feeds import Timeline
 from recipes.models import (
     FavoriteList,
     Ingredients,
     RecipeIngredients,
     Recipes,
     ShoppingCart,
+    ShoppingCartIngredients,
+    ShoppingListJob,
     Tags
 )
-from .filters import IngredientsSearchFilter, RecipesFilter
-from .pagination import CustomPageNumberPagination
+from .cache import cache_response, versioned_cache
+from .fieldsets import Fieldset
+from .filters import (
+    IngredientsSearchFilter,
+    RecipesFilter,
+    RecipesOrderingFilter
+)
+from .pagination import (
+    CursorPaginationMixin,
+    CustomPageNumberPagination,
+    FeedCursorPagination,
+    RecipesCursorPagination
+)
 from .permissions import AdminOrAuthorOrReadOnly
-from .reports import create_recipe_shopping_list
+from .renderers import SHOPPING_LIST_RENDERERS
+from .jobs import enqueue_shopping_list_job
+from .reports import create_recipe_shopping_list, shopping_list_rows
+from .search import ingredient_index
 from .serializers import (
     FavoriteListSerializer,
     IngredientsSerializer,
+    RecipeMatchSerializer,
     RecipesSerializer,
+    ShoppingCartIngredientsSerializer,
     ShoppingCartSerializer,
+    ShoppingListJobSerializer,
     TagsSerializer
 )
 
@@ -34,24 +67,139 @@ class TagsViewSet(ReadOnlyModelViewSet):
     serializer_class = TagsSerializer
     pagination_class = None
 
+    @cache_response("tags", public=True,
+                    max_age=settings.CATALOG_CACHE_MAX_AGE)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response("tags", public=True,
+                    max_age=settings.CATALOG_CACHE_MAX_AGE)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class IngredientsViewSet(ReadOnlyModelViewSet):
     """Viewset для модели Ingredients."""
-    queryset = Ingredients.objects.all()
+    queryset = Ingredients.objects.select_related("measurement_unit")
     serializer_class = IngredientsSerializer
     filter_backends = (IngredientsSearchFilter,)
-    search_fields = ("^name",)
     pagination_class = None
 
+    @cache_response("ingredients", public=True,
+                    max_age=settings.CATALOG_CACHE_MAX_AGE)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response("ingredients", public=True,
+                    max_age=settings.CATALOG_CACHE_MAX_AGE)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
-class RecipesViewSet(ModelViewSet):
+
+class RecipesViewSet(CursorPaginationMixin, ModelViewSet):
     """Viewset для модели Recipes."""
     queryset = Recipes.objects.all()
     serializer_class = RecipesSerializer
     permission_classes = (AdminOrAuthorOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, RecipesOrderingFilter)
     filterset_class = RecipesFilter
+    ordering_fields = ("pub_date", "favorites_count", "in_carts_count")
+    ordering = ("-pub_date", "-id")
     pagination_class = CustomPageNumberPagination
+    cursor_pagination_class = RecipesCursorPagination
+
+    def get_queryset(self):
+        fieldset = Fieldset(self.request)
+        queryset = Recipes.objects.all()
+        if (fieldset.wants("is_favorited")
+                or fieldset.wants("is_in_shopping_cart")):
+            queryset = queryset.with_user_flags(self.request.user)
+        if fieldset.expands("author"):
+            queryset = queryset.with_author(self.request.user)
+        if fieldset.wants("tags"):
+            queryset = queryset.with_tags()
+        if fieldset.wants("ingredients"):
+            queryset = queryset.with_ingredients(
+                details=fieldset.expands("ingredients"),
+            )
+        if not fieldset.wants("text"):
+            queryset = queryset.defer("text")
+        return queryset
+
+    def get_etag(self, recipes, page_meta=None):
+        """ETag страницы рецептов с учетом признаков пользователя и авторов."""
+        state = (
+            self.request.user.pk,
+            sorted(self.request.query_params.lists()),
+            page_meta,
+            versioned_cache.versions((
+                "tags", "ingredients",
+                *sorted({f"author:{recipe.author_id}" for recipe in recipes}),
+            )),
+            [
+                (recipe.pk, recipe.updated_at.isoformat(),
+                 getattr(recipe, "is_favorited", None),
+                 getattr(recipe, "is_in_shopping_cart", None),
+                 getattr(recipe, "is_author_subscribed", None))
+                for recipe in recipes
+            ],
+        )
+        return f'"{hashlib.sha1(repr(state).encode()).hexdigest()}"'
+
+    def conditional_response(self, recipes, build, page_meta=None):
+        """Отвечает 304 до сериализации, если у клиента актуальная версия.
+
+        Списки проверяются только по ETag: Last-Modified страницы
+        не меняется при удалении рецептов.
+        """
+        etag = self.get_etag(recipes, page_meta)
+        response = get_conditional_response(self.request, etag=etag)
+        if response is None:
+            prefetch_related_objects(recipes, *self.prefetch_lookups)
+            response = build(recipes)
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ("Authorization",))
+        return response
+
+    def get_unprefetched_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        # Связи подгружаются отдельно после проверки ETag.
+        self.prefetch_lookups = queryset._prefetch_related_lookups
+        return queryset.prefetch_related(None)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_unprefetched_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return self.conditional_response(
+                list(queryset),
+                lambda recipes: Response(
+                    self.get_serializer(recipes, many=True).data),
+            )
+        return self.conditional_response(
+            page,
+            lambda recipes: self.get_paginated_response(
+                self.get_serializer(recipes, many=True).data),
+            page_meta=self.get_paginated_response([]).data,
+        )
+
+    @cache_response("recipe:{pk}", "tags", "ingredients", per_user=True,
+                    private=True, no_cache=True)
+    def retrieve(self, request, *args, **kwargs):
+        recipe = get_object_or_404(self.get_queryset(),
+                                   pk=self.kwargs[self.lookup_field])
+        self.check_object_permissions(request, recipe)
+        response = Response(self.get_serializer(recipe).data)
+        response["Last-Modified"] = http_date(
+            calendar.timegm(recipe.updated_at.utctimetuple()))
+        return response
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ("list", "feed"):
+            context["thumbnail"] = settings.RECIPE_LIST_THUMBNAIL
+        return context
 
     @staticmethod
     def handle_action(request, pk, serializers, model):
@@ -97,17 +245,110 @@ class RecipesViewSet(ModelViewSet):
         permission_classes=(IsAuthenticated,),
         detail=False,
     )
-    def download_shopping_cart(self, request):
+    def shopping_cart_ingredients(self, request):
         ingredients = (
-            RecipeIngredients.objects.filter(
-                recipe__shopping_cart_recipe__user=request.user,
-            )
-            .values_list(
-                "ingredient__name",
-                "ingredient__measurement_unit__name",
-            )
-            .annotate(amount=Sum("amount"))
+            ShoppingCartIngredients.objects.filter(user=request.user)
+            .select_related("ingredient__measurement_unit")
             .order_by("ingredient__name")
         )
+        serializer = ShoppingCartIngredientsSerializer(ingredients, many=True)
+        return Response(serializer.data)
 
-        return create_recipe_shopping_list(ingredients)
+    @action(
+        methods=("GET",),
+        permission_classes=(IsAuthenticated,),
+        detail=False,
+        pagination_class=FeedCursorPagination,
+        cursor_pagination_class=None,
+    )
+    def feed(self, request):
+        """Рецепты авторов из подписок пользователя от новых к старым."""
+        recipe_ids = self.paginate_queryset(Timeline(request.user))
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True,
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def get_ingredient_ids(request):
+        """id из параметров ingredients=1,2 или ingredients=1&ingredients=2."""
+        values = [
+            value.strip()
+            for param in request.query_params.getlist("ingredients")
+            for value in param.split(",") if value.strip()
+        ]
+        if not values or not all(value.isdecimal() for value in values):
+            raise ValidationError(
+                {"ingredients": "Передайте id ингредиентов через запятую"},
+            )
+        return {int(value) for value in values}
+
+    @action(
+        methods=("GET",),
+        detail=False,
+        cursor_pagination_class=None,
+    )
+    def match(self, request):
+        """Рецепты по доле ингредиентов, которые уже есть у пользователя."""
+        ingredient_ids = self.get_ingredient_ids(request)
+        page = self.paginate_queryset(ingredient_index.match(ingredient_ids))
+        recipes = Recipes.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in page],
+        )
+        missing = defaultdict(list)
+        for recipe_ingredient in (
+            RecipeIngredients.objects.filter(recipe_id__in=recipes)
+            .exclude(ingredient_id__in=ingredient_ids)
+            .select_related("ingredient__measurement_unit")
+        ):
+            missing[recipe_ingredient.recipe_id].append(recipe_ingredient)
+        results = []
+        for recipe_id, count, total in page:
+            if recipe_id not in recipes:
+                continue
+            recipe = recipes[recipe_id]
+            recipe.coverage = round(count / total, 4)
+            recipe.missing_ingredients = missing[recipe_id]
+            results.append(recipe)
+        serializer = RecipeMatchSerializer(
+            results, many=True, context=self.get_serializer_context(),
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=("GET",),
+        permission_classes=(IsAuthenticated,),
+        detail=False,
+        renderer_classes=SHOPPING_LIST_RENDERERS,
+    )
+    def download_shopping_cart(self, request):
+        if request.query_params.get("mode") == "job":
+            job = enqueue_shopping_list_job(request.user)
+            data = ShoppingListJobSerializer(
+                job, context={"request": request}).data
+            response = JsonResponse(data, status=status.HTTP_202_ACCEPTED)
+            response["Location"] = data["url"]
+            return response
+
+        return create_recipe_shopping_list(
+            shopping_list_rows(request.user),
+            request.accepted_renderer.format,
+        )
+
+    @action(
+        methods=("GET",),
+        permission_classes=(IsAuthenticated,),
+        detail=False,
+        url_path=r"shopping_cart_jobs/(?P<job_id>[0-9a-f-]+)",
+    )
+    def shopping_cart_job(self, request, job_id):
+        job = get_object_or_404(ShoppingListJob, pk=job_id, user=request.user)
+        if job.status == ShoppingListJob.DONE:
+            return HttpResponseRedirect(
+                request.build_absolute_uri(job.file.url),
+                status=status.HTTP_303_SEE_OTHER,
+            )
+        serializer = ShoppingListJobSerializer(
+            job, context={"request": request})
+        return Response(serializer.data)
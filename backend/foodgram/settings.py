@@ -26,6 +26,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_filters',
     'rest_framework',
     'rest_framework.authtoken',
@@ -77,6 +78,43 @@ DATABASES = {
 }
 
 
+# Cache
+# CACHE_URL: redis://host:6379/1 - общий кэш процессов (django-redis),
+# file:///path/to/dir - файловый кэш, locmem:// - память процесса.
+
+CACHE_URL = os.getenv('CACHE_URL', 'locmem://')
+
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'foodgram',
+        }
+    }
+elif CACHE_URL.startswith('file://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_URL[len('file://'):],
+            'KEY_PREFIX': 'foodgram',
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'KEY_PREFIX': 'foodgram',
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+            },
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -146,9 +184,22 @@ DJOSER = {
 }
 
 
+CACHE_EARLY_EXPIRY_BETA = 1.0
+CACHE_LOCAL_SIZE = 512
+CACHE_LOCK_POLL_INTERVAL = 0.05
+CACHE_LOCK_TIMEOUT = 10
+CACHE_TIMEOUT = 60 * 60 * 24
+CATALOG_CACHE_MAX_AGE = 60 * 5
+DECLINATION_CACHE_SIZE = 1024
+FEED_FANOUT_LIMIT = 1000
+FEED_MAX_LENGTH = 500
 FONT_SIZE_14 = 14
 FONT_SIZE_18 = 18
 FONT_SIZE_12 = 12
+INDEX_CHANGE_LOG_SIZE = 100
+INGREDIENT_INDEX_CHUNK_SIZE = 10000
+INGREDIENTS_SEARCH_LIMIT = 20
+INGREDIENTS_TRIGRAM_SIMILARITY = 0.3
 LENGTH_NAME = 250
 LENGTH_SLUG = 20
 LINE_HEIGHT = 750
@@ -158,6 +209,25 @@ MAX_POSITIVE_AMOUNT = 32767
 MIN_COOKING_TIME_MINUTES = 1
 MIN_POSITIVE_AMOUNT = 0
 MINIMUM_ALLOWED_AMOUNT = 1
+PAGE_BOTTOM_MARGIN = 50
+PAGE_FOOTER_POSITION = 30
+RECIPE_IMAGE_FORMAT = 'WEBP'
+RECIPE_IMAGE_MAX_DIMENSION = 4096
+RECIPE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+RECIPE_IMAGE_QUALITY = 85
+RECIPE_LIST_THUMBNAIL = 'medium'
+RECIPE_SEARCH_CONFIG = 'russian'
 RECIPE_SHOPPING_LIST = 'recipe_shopping_list.pdf'
+RECIPE_SHORT_THUMBNAIL = 'small'
+RECIPE_THUMBNAIL_SIZES = {
+    'small': (320, 320),
+    'medium': (640, 640),
+}
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+SHOPPING_LIST_CHUNK_SIZE = 500
+SHOPPING_LIST_FONT = os.path.join(BASE_DIR, 'fonts', 'Ostrovsky.ttf')
+SHOPPING_LIST_JOB_TIMEOUT = 60 * 10
+SHOPPING_LIST_JOB_TTL = 60 * 60 * 24
+SHOPPING_LIST_JOB_WORKERS = 2
 TEXT_DIAGONAL_POSITION = 790
 TEXT_HORIZONTAL_CENTER = 220
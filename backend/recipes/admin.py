@@ -2,14 +2,18 @@ from django.contrib import admin
 
 from .models import (
     FavoriteList,
+    FeedEntry,
     Ingredients,
     MeasureUnits,
     RecipeIngredients,
     Recipes,
     RecipeTags,
     ShoppingCart,
+    ShoppingCartIngredients,
+    ShoppingListJob,
     Tags
 )
+from .signals import recipe_ingredients_changed
 
 
 @admin.register(MeasureUnits)
@@ -41,8 +45,9 @@ class RecipesAdmin(admin.ModelAdmin):
 
     model = Recipes
     inlines = (TagsInline, IngredientsInline)
-    list_display = ("name", "author", "favorite_count")
-    readonly_fields = ("favorite_count",)
+    list_display = ("name", "author", "favorite_count", "in_carts_count")
+    list_select_related = ("author",)
+    readonly_fields = ("favorite_count", "in_carts_count")
     search_fields = ("name",)
     list_filter = ("author", "name", "tags")
     filter_horizontal = ("tags",)
@@ -51,10 +56,25 @@ class RecipesAdmin(admin.ModelAdmin):
     def favorite_count(self, obj):
         """Метод для вычисления и отображения
         количества добавлений рецепта в избранное."""
-        return FavoriteList.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
     favorite_count.short_description = "Количество добавлений в избранное"
 
+    def save_related(self, request, form, formsets, change):
+        recipe = form.instance
+        ingredient_ids = set(
+            recipe.recipeingredients_set.values_list(
+                "ingredient_id", flat=True)
+        )
+        super().save_related(request, form, formsets, change)
+        ingredient_ids |= set(
+            recipe.recipeingredients_set.values_list(
+                "ingredient_id", flat=True)
+        )
+        recipe_ingredients_changed.send(
+            sender=Recipes, recipe=recipe, ingredient_ids=ingredient_ids,
+        )
+
 
 @admin.register(Tags)
 class TagsAdmin(admin.ModelAdmin):
@@ -80,3 +100,30 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "recipe")
     search_fields = ("user", "recipe")
     list_filter = ("user", "recipe")
+
+
+@admin.register(ShoppingCartIngredients)
+class ShoppingCartIngredientsAdmin(admin.ModelAdmin):
+    """Регистрация модели сводного списка покупок в админке."""
+    model = ShoppingCartIngredients
+    list_display = ("id", "user", "ingredient", "amount")
+    list_select_related = ("user", "ingredient")
+    search_fields = ("user__username",)
+
+
+@admin.register(FeedEntry)
+class FeedEntryAdmin(admin.ModelAdmin):
+    """Регистрация модели лент подписок в админке."""
+    model = FeedEntry
+    list_display = ("id", "user", "recipe", "author", "pub_date")
+    list_select_related = ("user", "recipe", "author")
+    search_fields = ("user__username",)
+
+
+@admin.register(ShoppingListJob)
+class ShoppingListJobAdmin(admin.ModelAdmin):
+    """Регистрация модели задач выгрузки списков покупок в админке."""
+    model = ShoppingListJob
+    list_display = ("id", "user", "status", "created")
+    list_filter = ("status",)
+    list_select_related = ("user",)
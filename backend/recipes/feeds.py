@@ -0,0 +1,189 @@
+from heapq import merge
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from users.models import CustomUser, Follow
+from .models import FeedEntry, Recipes
+
+
+def get_followers_count(author_id):
+    return CustomUser.objects.filter(pk=author_id).values_list(
+        "followers_count", flat=True,
+    ).first() or 0
+
+
+def fan_out(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора.
+
+    Рецепты авторов, у которых больше FEED_FANOUT_LIMIT подписчиков,
+    по лентам не раскладываются.
+    """
+    if get_followers_count(recipe.author_id) > settings.FEED_FANOUT_LIMIT:
+        return
+    user_ids = list(Follow.objects.filter(
+        author_id=recipe.author_id,
+    ).values_list("user_id", flat=True))
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe=recipe,
+                      author_id=recipe.author_id, pub_date=recipe.pub_date)
+            for user_id in user_ids
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    trim(user_ids)
+
+
+def backfill(author_id, user_ids):
+    """Добавляет последние FEED_MAX_LENGTH рецептов автора в ленты."""
+    recipes = list(
+        Recipes.objects.filter(author_id=author_id)
+        .order_by("-pub_date", "-id")
+        .values_list("pk", "pub_date")[:settings.FEED_MAX_LENGTH]
+    )
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                      author_id=author_id, pub_date=pub_date)
+            for user_id in user_ids
+            for recipe_id, pub_date in recipes
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def trim(user_ids=None):
+    """Оставляет в лентах FEED_MAX_LENGTH новых записей.
+
+    user_ids=None обрезает ленты всех пользователей. Нумеруются записи
+    только тех лент, которые длиннее FEED_MAX_LENGTH.
+    """
+    entries = FeedEntry.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+        entries = entries.filter(user_id__in=user_ids)
+    user_ids = list(
+        entries.order_by().values("user_id")
+        .annotate(total=Count("pk"))
+        .filter(total__gt=settings.FEED_MAX_LENGTH)
+        .values_list("user_id", flat=True)
+    )
+    if not user_ids:
+        return 0
+    entries = FeedEntry.objects.filter(user_id__in=user_ids)
+    sql, params = entries.annotate(
+        entry_rank=Window(
+            RowNumber(),
+            partition_by=F("user_id"),
+            order_by=(F("pub_date").desc(), F("recipe_id").desc()),
+        ),
+    ).values("pk", "entry_rank").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FeedEntry._meta.db_table} WHERE id IN "
+            f"(SELECT id FROM ({sql}) AS ranked WHERE entry_rank > %s)",
+            (*params, settings.FEED_MAX_LENGTH),
+        )
+        return cursor.rowcount
+
+
+def follow(user_id, author_id):
+    """Заполняет ленту после подписки на автора."""
+    followers_count = get_followers_count(author_id)
+    if followers_count <= settings.FEED_FANOUT_LIMIT:
+        backfill(author_id, [user_id])
+        trim([user_id])
+    elif followers_count == settings.FEED_FANOUT_LIMIT + 1:
+        # Автор стал популярным: его рецепты читаются при запросе ленты.
+        FeedEntry.objects.filter(author_id=author_id).delete()
+
+
+def unfollow(user_id, author_id):
+    """Убирает рецепты автора из ленты после отписки."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    if get_followers_count(author_id) == settings.FEED_FANOUT_LIMIT:
+        # Автор перестал быть популярным: рецепты, опубликованные без
+        # раскладки, переносятся в ленты подписчиков.
+        user_ids = list(Follow.objects.filter(
+            author_id=author_id,
+        ).values_list("user_id", flat=True))
+        backfill(author_id, user_ids)
+        trim(user_ids)
+
+
+def rebuild():
+    """Пересчитывает счетчики подписчиков и заново заполняет ленты."""
+    with transaction.atomic():
+        CustomUser.objects.update(followers_count=Coalesce(Subquery(
+            Follow.objects.filter(author=OuterRef("pk"))
+            .order_by()
+            .values("author")
+            .annotate(total=Count("pk"))
+            .values("total"),
+        ), 0))
+        FeedEntry.objects.all().delete()
+        author_ids = CustomUser.objects.filter(
+            followers_count__gt=0,
+            followers_count__lte=settings.FEED_FANOUT_LIMIT,
+        ).values_list("pk", flat=True)
+        for author_id in author_ids.iterator():
+            backfill(author_id, Follow.objects.filter(
+                author_id=author_id,
+            ).values_list("user_id", flat=True))
+        trim()
+        return FeedEntry.objects.count()
+
+
+class Timeline:
+    """Лента подписок пользователя от новых рецептов к старым.
+
+    Объединяет при чтении материализованные записи FeedEntry и рецепты
+    популярных авторов (больше FEED_FANOUT_LIMIT подписчиков), которые
+    по лентам не раскладываются.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def page(self, position=None, limit=None):
+        """До limit пар (pub_date, id рецепта) после позиции position.
+
+        position - пара (pub_date, id рецепта) последнего рецепта
+        предыдущей страницы.
+        """
+        entries = FeedEntry.objects.filter(user=self.user).order_by(
+            "-pub_date", "-recipe_id",
+        ).values_list("pub_date", "recipe_id")
+        recipes = Recipes.objects.filter(
+            author__in=Follow.objects.filter(
+                user=self.user,
+                author__followers_count__gt=settings.FEED_FANOUT_LIMIT,
+            ).values("author"),
+        ).order_by("-pub_date", "-id").values_list("pub_date", "id")
+        if position is not None:
+            pub_date, recipe_id = position
+            entries = entries.filter(
+                Q(pub_date__lt=pub_date)
+                | Q(pub_date=pub_date, recipe_id__lt=recipe_id),
+            )
+            recipes = recipes.filter(
+                Q(pub_date__lt=pub_date)
+                | Q(pub_date=pub_date, id__lt=recipe_id),
+            )
+        results, seen = [], set()
+        for pub_date, recipe_id in merge(
+                list(entries[:limit]), list(recipes[:limit]), reverse=True):
+            if recipe_id in seen:
+                continue
+            seen.add(recipe_id)
+            results.append((pub_date, recipe_id))
+            if len(results) == limit:
+                break
+        return results
@@ -0,0 +1,56 @@
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+THUMBNAILS_DIR = "images/thumbs"
+
+
+def image_format():
+    """Формат хранения изображений, поддерживаемый установленным Pillow."""
+    if settings.RECIPE_IMAGE_FORMAT == "WEBP" and not features.check("webp"):
+        return "JPEG"
+    return settings.RECIPE_IMAGE_FORMAT
+
+
+def image_extension():
+    return "jpg" if image_format() == "JPEG" else image_format().lower()
+
+
+def encode_image(image):
+    """Перекодирует изображение в формат хранения без метаданных."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info
+                              else "RGB")
+    if image_format() == "JPEG" and image.mode == "RGBA":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format(),
+               quality=settings.RECIPE_IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+def thumbnail_name(name, size):
+    """Путь к миниатюре изображения рецепта заданного размера."""
+    base_name, _ = os.path.splitext(os.path.basename(name))
+    return f"{THUMBNAILS_DIR}/{size}/{base_name}.{image_extension()}"
+
+
+def has_thumbnails(image):
+    size = next(iter(settings.RECIPE_THUMBNAIL_SIZES))
+    return image.storage.exists(thumbnail_name(image.name, size))
+
+
+def create_thumbnails(image):
+    """Создает миниатюры всех размеров из RECIPE_THUMBNAIL_SIZES."""
+    with image.open("rb") as file, Image.open(file) as original:
+        original.load()
+        for size, dimensions in settings.RECIPE_THUMBNAIL_SIZES.items():
+            thumbnail = original.copy()
+            thumbnail.thumbnail(dimensions)
+            name = thumbnail_name(image.name, size)
+            image.storage.delete(name)
+            image.storage.save(name, ContentFile(encode_image(thumbnail)))
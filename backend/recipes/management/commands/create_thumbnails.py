@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import create_thumbnails, has_thumbnails
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    help = 'Создать миниатюры для изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать уже существующие миниатюры',
+        )
+
+    def handle(self, *args, **options):
+        created = 0
+        recipes = Recipes.objects.exclude(image='').exclude(image=None)
+        for recipe in recipes.only('image').iterator():
+            if not options['force'] and has_thumbnails(recipe.image):
+                continue
+            try:
+                create_thumbnails(recipe.image)
+            except FileNotFoundError:
+                self.stderr.write(f'Файл {recipe.image.name} не найден')
+                continue
+            created += 1
+        self.stdout.write(self.style.SUCCESS(f'Миниатюры созданы '
+                                             f'для {created} рецептов'))
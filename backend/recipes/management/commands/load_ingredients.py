@@ -1,28 +1,144 @@
 import csv
-from django.core.management.base import BaseCommand
+import json
+import os
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import versioned_cache
 from recipes.models import Ingredients, MeasureUnits
 
+HEADER = ("name", "measurement_unit")
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(data_file, chunk_size=JSON_CHUNK_SIZE):
+    """Читает элементы JSON-массива по одному, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer, started = '', False
+    while True:
+        chunk = data_file.read(chunk_size)
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise CommandError('JSON-файл должен содержать массив')
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Элемент прочитан не полностью.
+                if not chunk:
+                    raise CommandError('Некорректный JSON-файл')
+                break
+            if end == len(buffer) and chunk:
+                # Число на границе блока может продолжиться в следующем.
+                break
+            position = end
+            yield item
+        buffer = buffer[position:]
+        if not chunk:
+            raise CommandError('Некорректный JSON-файл')
+
 
 class Command(BaseCommand):
-    help = 'Импортировать ингредиенты из CSV файла'
+    help = 'Импортировать ингредиенты из CSV или JSON файла'
 
-    def handle(self, *args, **options):
-        file_path = 'data/ingredients.csv'
-        with open(file_path, 'r', encoding='utf-8') as csv_file:
-            csv_reader = csv.reader(csv_file)
-            next(csv_reader)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv'),
+            help='Путь к файлу .csv или .json',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк, загружаемых за одну транзакцию',
+        )
 
-            for row in csv_reader:
-                name, measurement_unit_name = row[0], row[1]
+    def handle(self, *args, **options):
+        file_path = options['path']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        units = dict(MeasureUnits.objects.values_list('name', 'id'))
+        count_before = Ingredients.objects.count()
+        self.skipped = 0
+        rows = self.read_rows(file_path)
+        while True:
+            chunk = {
+                (name, unit) for name, unit in islice(rows, batch_size)
+            }
+            if not chunk:
+                break
+            with transaction.atomic():
+                self.resolve_units({unit for _, unit in chunk}, units)
+                Ingredients.objects.bulk_create(
+                    (
+                        Ingredients(name=name,
+                                    measurement_unit_id=units[unit])
+                        for name, unit in chunk
+                    ),
+                    ignore_conflicts=True,
+                )
+        versioned_cache.invalidate('ingredients')
+        created = Ingredients.objects.count() - count_before
+        self.stdout.write(self.style.SUCCESS(f'Ингредиенты успешно '
+                                             f'импортированы в базу данных: '
+                                             f'добавлено {created}'))
+        if self.skipped:
+            self.stderr.write(f'Пропущено строк без единицы измерения: '
+                              f'{self.skipped}')
 
-                measurement_unit, created = MeasureUnits.objects.get_or_create(
-                    name=measurement_unit_name)
+    def read_rows(self, file_path):
+        """Построчно читает пары (название, единица измерения).
 
-                ingredient = Ingredients.objects.create(
-                    name=name,
-                    measurement_unit=measurement_unit
+        Строки без единицы измерения пропускаются: NULL не участвует
+        в уникальности, и повторная загрузка создала бы дубликаты.
+        """
+        _, extension = os.path.splitext(file_path)
+        with open(file_path, 'r', encoding='utf-8') as data_file:
+            if extension == '.json':
+                rows = (
+                    (item['name'], item.get('measurement_unit') or '')
+                    for item in iter_json_array(data_file)
                 )
-                ingredient.save()
+            elif extension == '.csv':
+                rows = csv.reader(data_file)
+            else:
+                raise CommandError(f'Неподдерживаемый формат: {extension}')
+            for row in rows:
+                name, measurement_unit_name = row[0].strip(), row[1].strip()
+                if (name, measurement_unit_name) == HEADER or not name:
+                    continue
+                if not measurement_unit_name:
+                    self.skipped += 1
+                    continue
+                yield name, measurement_unit_name
 
-        self.stdout.write(self.style.SUCCESS('Ингредиенты успешно '
-                                             'импортированы в базу данных'))
+    @staticmethod
+    def resolve_units(names, units):
+        """Создает недостающие единицы измерения одним запросом."""
+        missing = names - units.keys()
+        if not missing:
+            return
+        MeasureUnits.objects.bulk_create(
+            (MeasureUnits(name=name) for name in missing),
+            ignore_conflicts=True,
+        )
+        units.update(
+            MeasureUnits.objects.filter(name__in=missing)
+            .values_list('name', 'id')
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feeds import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать счетчики подписчиков и заново заполнить ленты подписок'
+
+    def handle(self, *args, **options):
+        entries = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Ленты подписок заполнены: '
+                                             f'{entries} записей'))
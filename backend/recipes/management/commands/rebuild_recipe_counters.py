@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать счетчики избранного и списков покупок рецептов'
+
+    def handle(self, *args, **options):
+        updated = Recipes.objects.rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f'Счетчики пересчитаны '
+                                             f'для {updated} рецептов'))
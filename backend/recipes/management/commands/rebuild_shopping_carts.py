@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import ShoppingCartIngredients
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать сводные списки покупок всех пользователей'
+
+    def handle(self, *args, **options):
+        ShoppingCartIngredients.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересчитаны: '
+            f'{ShoppingCartIngredients.objects.count()} строк'
+        ))
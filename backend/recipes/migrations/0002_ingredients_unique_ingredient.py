@@ -0,0 +1,46 @@
+# Generated by Django 3.2.20 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_ingredients(apps, schema_editor):
+    Ingredients = apps.get_model('recipes', 'Ingredients')
+    RecipeIngredients = apps.get_model('recipes', 'RecipeIngredients')
+    duplicates = (
+        Ingredients.objects.order_by()
+        .values('name', 'measurement_unit')
+        .annotate(keep_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        extra = Ingredients.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).exclude(id=duplicate['keep_id'])
+        for row in RecipeIngredients.objects.filter(ingredient__in=extra):
+            if RecipeIngredients.objects.filter(
+                    recipe_id=row.recipe_id,
+                    ingredient_id=duplicate['keep_id']).exists():
+                row.delete()
+            else:
+                row.ingredient_id = duplicate['keep_id']
+                row.save()
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_ingredients, migrations.RunPython.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='ingredients',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.20 on 2026-10-18 06:05
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POPULATE_AND_INDEX = (
+    "UPDATE recipes_recipes AS recipe SET search_vector = "
+    "setweight(to_tsvector('russian', recipe.name), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(("
+    "SELECT string_agg(ingredient.name, ' ') "
+    "FROM recipes_recipeingredients AS recipe_ingredient "
+    "JOIN recipes_ingredients AS ingredient "
+    "ON ingredient.id = recipe_ingredient.ingredient_id "
+    "WHERE recipe_ingredient.recipe_id = recipe.id), '')), 'B') || "
+    "setweight(to_tsvector('russian', recipe.text), 'C')",
+    'CREATE INDEX IF NOT EXISTS recipes_recipes_search_vector_idx '
+    'ON recipes_recipes USING gin (search_vector)',
+)
+DROP_INDEX = (
+    'DROP INDEX IF EXISTS recipes_recipes_search_vector_idx',
+)
+
+
+def run_on_postgresql(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipes_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            run_on_postgresql(POPULATE_AND_INDEX),
+            run_on_postgresql(DROP_INDEX),
+        ),
+    ]
@@ -1,9 +1,32 @@
+import uuid
+
 from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField
+)
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import (
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Sum,
+    Value,
+    Window
+)
+from django.db.models.functions import Coalesce, RowNumber
 from django.conf import settings
 
+from users.models import Follow
+
 User = get_user_model()
 
 
@@ -52,11 +75,138 @@ class Ingredients(models.Model):
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
         ordering = ("name",)
+        constraints = [
+            models.UniqueConstraint(
+                name="unique_ingredient",
+                fields=["name", "measurement_unit"],
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipesQuerySet(models.QuerySet):
+    """Набор запросов для рецептов."""
+
+    def with_user_flags(self, user):
+        """Добавляет признаки избранного и списка покупок пользователя."""
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False, output_field=models.BooleanField()),
+                is_in_shopping_cart=Value(
+                    False, output_field=models.BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=Exists(FavoriteList.objects.filter(
+                user=user, recipe=OuterRef("pk"))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef("pk"))),
+        )
+
+    def with_author(self, user):
+        """Присоединяет автора и признак подписки пользователя на него."""
+        queryset = self.select_related("author")
+        if user.is_anonymous:
+            return queryset
+        return queryset.annotate(
+            is_author_subscribed=Exists(Follow.objects.filter(
+                user=user, author=OuterRef("author"))),
+        )
+
+    def latest_by_author(self, author_ids, limit=None):
+        """Возвращает словарь {id автора: последние рецепты}.
+
+        Не более limit рецептов на автора выбираются одним запросом
+        с ROW_NUMBER() OVER (PARTITION BY author_id).
+        """
+        if not author_ids:
+            return {}
+        queryset = self.filter(author_id__in=author_ids)
+        if limit is None:
+            recipes = queryset.order_by("-pub_date", "-id")
+        else:
+            sql, params = queryset.annotate(
+                recipe_rank=Window(
+                    RowNumber(),
+                    partition_by=F("author_id"),
+                    order_by=(F("pub_date").desc(), F("id").desc()),
+                ),
+            ).query.sql_with_params()
+            recipes = self.raw(
+                f"SELECT * FROM ({sql}) AS ranked "
+                f"WHERE recipe_rank <= %s ORDER BY recipe_rank",
+                (*params, limit),
+            )
+        recipes_by_author = {author_id: [] for author_id in author_ids}
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        return recipes_by_author
+
+    def rebuild_counters(self):
+        """Пересчитывает счетчики избранного и списков покупок."""
+        def count(model):
+            return Coalesce(Subquery(
+                model.objects.filter(recipe=OuterRef("pk"))
+                .order_by()
+                .values("recipe")
+                .annotate(total=Count("pk"))
+                .values("total"),
+            ), 0)
+
+        return self.update(
+            favorites_count=count(FavoriteList),
+            in_carts_count=count(ShoppingCart),
+        )
+
+    def update_search_vector(self):
+        """Пересчитывает поисковый вектор рецептов на PostgreSQL.
+
+        В вектор входят название (вес A), названия ингредиентов (B)
+        и описание (C).
+        """
+        if connection.vendor != "postgresql":
+            return 0
+        config = settings.RECIPE_SEARCH_CONFIG
+        ingredient_names = Subquery(
+            RecipeIngredients.objects.filter(recipe=OuterRef("pk"))
+            .order_by()
+            .values("recipe")
+            .annotate(names=StringAgg("ingredient__name", " "))
+            .values("names"),
+        )
+        return self.update(search_vector=(
+            SearchVector("name", weight="A", config=config)
+            + SearchVector(ingredient_names, weight="B", config=config)
+            + SearchVector("text", weight="C", config=config)
+        ))
+
+    def search(self, query):
+        """Полнотекстовый поиск по search_vector с рангом search_rank."""
+        search_query = SearchQuery(query,
+                                   config=settings.RECIPE_SEARCH_CONFIG,
+                                   search_type="websearch")
+        return self.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F("search_vector"), search_query),
+        )
+
+    def with_tags(self):
+        """Загружает теги рецептов одним запросом."""
+        return self.prefetch_related("tags")
+
+    def with_ingredients(self, details=True):
+        """Загружает ингредиенты рецептов одним запросом.
+
+        details=False загружает только id ингредиентов и количество.
+        """
+        queryset = RecipeIngredients.objects.all()
+        if details:
+            queryset = queryset.select_related("ingredient__measurement_unit")
+        return self.prefetch_related(
+            Prefetch("recipeingredients_set", queryset=queryset),
+        )
+
+
 class Recipes(models.Model):
     """Модель рецептов."""
     author = models.ForeignKey(
@@ -94,11 +244,32 @@ class Recipes(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
+    search_vector = SearchVectorField("Поисковый вектор", null=True,
+                                      editable=False)
+    favorites_count = models.PositiveIntegerField(
+        "Количество добавлений в избранное",
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        "Количество добавлений в список покупок",
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipesQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                name="recipes_pub_date_id_idx",
+                fields=["-pub_date", "-id"],
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -143,6 +314,12 @@ class RecipeTags(models.Model):
                 fields=["recipe", "tag"],
             ),
         ]
+        indexes = [
+            models.Index(
+                name="recipe_tags_tag_recipe_idx",
+                fields=["tag", "recipe"],
+            ),
+        ]
 
 
 class FavoriteList(models.Model):
@@ -202,3 +379,168 @@ class ShoppingCart(models.Model):
     def __str__(self):
         return (f"{self.user.username} добавил"
                 f"{self.recipe.name} в список покупок")
+
+
+class ShoppingCartIngredients(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя.
+
+    Обновляется при изменении списка покупок и состава рецептов в нем.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredients,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField("Количество")
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                name="unique_shopping_cart_ingredient",
+                fields=["user", "ingredient"],
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.ingredient} - {self.amount}"
+
+    @classmethod
+    def totals(cls, **filters):
+        """Суммы ингредиентов из рецептов в списках покупок."""
+        return (
+            RecipeIngredients.objects.filter(**filters)
+            .order_by()
+            .values("recipe__shopping_cart_recipe__user", "ingredient")
+            .annotate(total=Sum("amount"))
+        )
+
+    @classmethod
+    def create_from_totals(cls, totals):
+        cls.objects.bulk_create(
+            (
+                cls(user_id=row["recipe__shopping_cart_recipe__user"],
+                    ingredient_id=row["ingredient"],
+                    amount=row["total"])
+                for row in totals.iterator()
+            ),
+            batch_size=1000,
+        )
+
+    @classmethod
+    def refresh(cls, user_ids, ingredient_ids):
+        """Пересчитывает суммы указанных ингредиентов пользователей."""
+        user_ids, ingredient_ids = list(user_ids), list(ingredient_ids)
+        if not user_ids or not ingredient_ids:
+            return
+        with transaction.atomic():
+            cls.objects.filter(
+                user_id__in=user_ids, ingredient_id__in=ingredient_ids,
+            ).delete()
+            cls.create_from_totals(cls.totals(
+                recipe__shopping_cart_recipe__user__in=user_ids,
+                ingredient_id__in=ingredient_ids,
+            ))
+
+    @classmethod
+    def rebuild(cls):
+        """Полностью пересчитывает списки покупок всех пользователей."""
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.create_from_totals(cls.totals(
+                recipe__shopping_cart_recipe__isnull=False,
+            ))
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя.
+
+    Записи создаются при публикации рецепта автором, у которого не больше
+    FEED_FANOUT_LIMIT подписчиков. Рецепты более популярных авторов
+    добавляются в ленту при чтении. pub_date копирует дату публикации
+    рецепта, чтобы лента читалась по одному индексу.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipes,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи лент подписок'
+        constraints = [
+            models.UniqueConstraint(
+                name="unique_feed_entry",
+                fields=["user", "recipe"],
+            ),
+        ]
+        indexes = [
+            models.Index(
+                name="feed_entry_user_pub_date_idx",
+                fields=["user", "-pub_date", "-recipe"],
+            ),
+            models.Index(
+                name="feed_entry_user_author_idx",
+                fields=["user", "author"],
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.recipe}"
+
+
+class ShoppingListJob(models.Model):
+    """Задача фоновой генерации PDF списка покупок."""
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Готово"),
+        (FAILED, "Ошибка"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4,
+                          editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_jobs',
+        verbose_name='Пользователь'
+    )
+    status = models.CharField("Статус", max_length=20,
+                              choices=STATUS_CHOICES, default=PENDING)
+    file = models.FileField("Файл", upload_to="shopping_lists", blank=True)
+    created = models.DateTimeField("Дата создания", auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Задача выгрузки списка покупок'
+        verbose_name_plural = 'Задачи выгрузки списков покупок'
+        ordering = ("-created",)
+
+    def __str__(self):
+        return f"{self.user}: {self.get_status_display()}"
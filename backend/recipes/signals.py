@@ -0,0 +1,143 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from users.models import Follow
+from . import feeds
+from .images import create_thumbnails, has_thumbnails
+from .models import (
+    FavoriteList,
+    Ingredients,
+    RecipeIngredients,
+    Recipes,
+    ShoppingCart,
+    ShoppingCartIngredients
+)
+
+# Отправляется после изменения состава рецепта с аргументами recipe и
+# ingredient_ids - id всех добавленных, измененных и удаленных ингредиентов.
+recipe_ingredients_changed = Signal()
+
+COUNTER_FIELDS = {
+    FavoriteList: "favorites_count",
+    ShoppingCart: "in_carts_count",
+}
+
+
+@receiver(post_save, sender=FavoriteList)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    """Увеличивает счетчик рецепта при добавлении в список."""
+    if created:
+        field = COUNTER_FIELDS[sender]
+        Recipes.objects.filter(pk=instance.recipe_id).update(
+            **{field: F(field) + 1},
+        )
+
+
+@receiver(post_delete, sender=FavoriteList)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    """Уменьшает счетчик рецепта при удалении из списка."""
+    field = COUNTER_FIELDS[sender]
+    Recipes.objects.filter(
+        pk=instance.recipe_id, **{f"{field}__gt": 0},
+    ).update(**{field: F(field) - 1})
+
+
+def recipe_ingredient_ids(recipe_id):
+    return set(
+        RecipeIngredients.objects.filter(recipe_id=recipe_id)
+        .values_list("ingredient_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_cart_totals(sender, instance, created, **kwargs):
+    """Добавляет ингредиенты рецепта в сводный список покупок."""
+    if created:
+        ShoppingCartIngredients.refresh(
+            [instance.user_id], recipe_ingredient_ids(instance.recipe_id),
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remember_cart_ingredients(sender, instance, **kwargs):
+    """Запоминает ингредиенты рецепта до каскадного удаления."""
+    instance.cart_ingredient_ids = recipe_ingredient_ids(instance.recipe_id)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_cart_totals(sender, instance, **kwargs):
+    """Убирает ингредиенты рецепта из сводного списка покупок."""
+    ingredient_ids = getattr(instance, "cart_ingredient_ids", None)
+    if ingredient_ids is None:
+        ingredient_ids = recipe_ingredient_ids(instance.recipe_id)
+    ShoppingCartIngredients.refresh([instance.user_id], ingredient_ids)
+
+
+@receiver(recipe_ingredients_changed)
+def refresh_cart_totals(sender, recipe, ingredient_ids, **kwargs):
+    """Пересчитывает списки покупок, в которых есть измененный рецепт."""
+    ShoppingCartIngredients.refresh(
+        ShoppingCart.objects.filter(recipe=recipe)
+        .values_list("user_id", flat=True),
+        ingredient_ids,
+    )
+
+
+@receiver(post_save, sender=Recipes)
+def make_recipe_thumbnails(sender, instance, **kwargs):
+    """Создает миниатюры для нового изображения рецепта."""
+    if not instance.image or has_thumbnails(instance.image):
+        return
+    try:
+        create_thumbnails(instance.image)
+    except FileNotFoundError:
+        pass
+
+
+@receiver(post_save, sender=Recipes)
+def update_recipe_search_vector(sender, instance, **kwargs):
+    """Обновляет поисковый вектор сохраненного рецепта."""
+    Recipes.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(recipe_ingredients_changed)
+def update_search_vector_ingredients(sender, recipe, **kwargs):
+    """Обновляет поисковый вектор после изменения состава рецепта."""
+    Recipes.objects.filter(pk=recipe.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Ingredients)
+def update_search_vector_ingredient_name(sender, instance, created,
+                                         **kwargs):
+    """Обновляет поисковые векторы рецептов с переименованным ингредиентом."""
+    if not created:
+        Recipes.objects.filter(
+            ingredients=instance,
+        ).update_search_vector()
+
+
+@receiver(post_save, sender=Recipes)
+def add_to_feeds(sender, instance, created, **kwargs):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    if created:
+        feeds.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def fill_feed(sender, instance, created, **kwargs):
+    """Добавляет рецепты автора в ленту нового подписчика.
+
+    Выполняется после обновления счетчика подписчиков в users.signals.
+    """
+    if created:
+        feeds.follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_feed(sender, instance, **kwargs):
+    """Убирает рецепты автора из ленты бывшего подписчика."""
+    feeds.unfollow(instance.user_id, instance.author_id)
+
@@ -0,0 +1,109 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api.benchmark import IMAGE
+from recipes.models import (
+    Ingredients,
+    MeasureUnits,
+    RecipeIngredients,
+    Recipes,
+    RecipeTags,
+    Tags
+)
+from users.models import CustomUser
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Значения в кэше не переживают откат данных между тестами."""
+    cache.clear()
+
+
+@pytest.fixture
+def user():
+    return CustomUser.objects.create(
+        username="cook", email="cook@example.com",
+        first_name="Имя", last_name="Фамилия",
+    )
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tags.objects.create(name=f"Тег {i}", slug=f"tag-{i}")
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    unit = MeasureUnits.objects.create(name="г")
+    return [
+        Ingredients.objects.create(name=f"Ингредиент {i}",
+                                   measurement_unit=unit)
+        for i in range(10)
+    ]
+
+
+@pytest.fixture
+def make_recipes(user, tags, ingredients):
+    """Создает count рецептов с тегами и ингредиентами.
+
+    fields заменяют значения полей рецепта по умолчанию.
+    """
+    def make(count, author=None, ingredients_per_recipe=3, **fields):
+        author = author or user
+        recipes = [
+            Recipes.objects.create(**{
+                "author": author, "name": f"Рецепт {i}", "text": "Описание",
+                "image": "images/recipe.png", "cooking_time": 10, **fields,
+            })
+            for i in range(count)
+        ]
+        RecipeTags.objects.bulk_create(
+            RecipeTags(recipe=recipe, tag=tag)
+            for recipe in recipes for tag in tags[:2]
+        )
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(recipe=recipe, ingredient=ingredient,
+                              amount=10)
+            for recipe in recipes
+            for ingredient in ingredients[:ingredients_per_recipe]
+        )
+        return recipes
+    return make
+
+
+@pytest.fixture
+def recipe_payload(tags, ingredients):
+    """Тело запроса на создание рецепта через API."""
+    return {
+        "name": "Рецепт",
+        "text": "Описание",
+        "cooking_time": 10,
+        "image": IMAGE,
+        "tags": [tags[0].id],
+        "ingredients": [{"id": ingredients[0].id, "amount": 10}],
+    }
+
+
+@pytest.fixture
+def create_recipe(user_client, recipe_payload):
+    """Создает рецепт через API, fields заменяют поля recipe_payload."""
+    def create(**fields):
+        return user_client.post("/api/recipes/",
+                                {**recipe_payload, **fields}, format="json")
+    return create
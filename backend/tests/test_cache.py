@@ -0,0 +1,44 @@
+from itertools import count
+
+import pytest
+from django.core.cache import cache
+
+from api.cache import versioned_cache
+
+
+@pytest.fixture
+def builder():
+    """Функция построения значения, возвращающая номер вызова."""
+    calls = count(1)
+    return lambda: next(calls)
+
+
+def test_value_is_rebuilt_after_invalidation(builder):
+    assert versioned_cache.get_or_build("test", "key", builder) == 1
+    assert versioned_cache.get_or_build("test", "key", builder) == 1
+    versioned_cache.invalidate("test")
+    assert versioned_cache.get_or_build("test", "key", builder) == 2
+
+
+def test_value_depends_on_every_namespace(builder):
+    namespaces = ("test", "other")
+    assert versioned_cache.get_or_build(namespaces, "key", builder) == 1
+    versioned_cache.invalidate("other")
+    assert versioned_cache.get_or_build(namespaces, "key", builder) == 2
+
+
+def test_evicted_version_does_not_revive_old_values(builder):
+    first = versioned_cache.version("test")
+    assert versioned_cache.get_or_build("test", "key", builder) == 1
+    versioned_cache.invalidate("test")
+    assert versioned_cache.get_or_build("test", "key", builder) == 2
+    cache.delete(versioned_cache.version_key("test"))
+
+    assert versioned_cache.versions(("test",))[0] not in (first, first + 1)
+    assert versioned_cache.get_or_build("test", "key", builder) == 3
+
+
+def test_invalidate_evicted_version_starts_new_sequence():
+    first = versioned_cache.invalidate("test")
+    cache.delete(versioned_cache.version_key("test"))
+    assert versioned_cache.invalidate("test") not in (first, first + 1)
@@ -0,0 +1,79 @@
+import pytest
+from rest_framework.test import APIClient
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize("authenticated", (True, False))
+def test_recipe_list_etag_changes_with_author(
+        user, user_client, make_recipes, django_capture_on_commit_callbacks,
+        authenticated):
+    make_recipes(2)
+    client = user_client if authenticated else APIClient()
+    response = client.get("/api/recipes/")
+    etag = response["ETag"]
+    assert client.get(
+        "/api/recipes/", HTTP_IF_NONE_MATCH=etag,
+    ).status_code == 304
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.first_name = "Новое имя"
+        user.save()
+
+    response = client.get("/api/recipes/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert {
+        recipe["author"]["first_name"]
+        for recipe in response.data["results"]
+    } == {"Новое имя"}
+
+
+def test_password_change_keeps_recipe_validators(user, user_client,
+                                                 make_recipes):
+    recipe, = make_recipes(1)
+    etag = user_client.get("/api/recipes/")["ETag"]
+    user_client.get(f"/api/recipes/{recipe.id}/")
+
+    user.set_password("New-Pa55word")
+    user.save()
+
+    assert user_client.get(
+        "/api/recipes/", HTTP_IF_NONE_MATCH=etag,
+    ).status_code == 304
+    updated_at = recipe.updated_at
+    recipe.refresh_from_db()
+    assert recipe.updated_at == updated_at
+
+
+def test_recipe_detail_shows_renamed_author(user, user_client, make_recipes,
+                                            django_capture_on_commit_callbacks):
+    recipe, = make_recipes(1)
+    user_client.get(f"/api/recipes/{recipe.id}/")
+    with django_capture_on_commit_callbacks(execute=True):
+        user.last_name = "Новая фамилия"
+        user.save()
+    response = user_client.get(f"/api/recipes/{recipe.id}/")
+    assert response.json()["author"]["last_name"] == "Новая фамилия"
+
+
+def test_recipe_list_is_revalidated_by_etag_only(user, make_recipes):
+    recipes = make_recipes(3)
+    client = APIClient()
+    response = client.get("/api/recipes/")
+    assert "Last-Modified" not in response
+    etag = response["ETag"]
+
+    recipes[0].delete()
+
+    response = client.get(
+        "/api/recipes/", HTTP_IF_NONE_MATCH=etag,
+        HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT",
+    )
+    assert response.status_code == 200
+    assert response.data["count"] == 2
+    response = client.get(
+        "/api/recipes/",
+        HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT",
+    )
+    assert response.status_code == 200
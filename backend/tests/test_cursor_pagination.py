@@ -0,0 +1,62 @@
+import pytest
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+
+pytestmark = pytest.mark.django_db
+
+
+def read_pages(client, url):
+    """id объектов всех страниц и число запрошенных страниц."""
+    ids, pages = [], 0
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert "count" not in data
+        ids += [item["id"] for item in data["results"]]
+        url = data["next"]
+        pages += 1
+    return ids, pages
+
+
+def newest_first(recipes):
+    return [
+        recipe.id for recipe in sorted(
+            recipes, key=lambda recipe: (recipe.pub_date, recipe.id),
+            reverse=True,
+        )
+    ]
+
+
+def test_next_links_walk_all_recipes(make_recipes):
+    recipes = make_recipes(5, ingredients_per_recipe=1)
+    ids, pages = read_pages(APIClient(),
+                            "/api/recipes/?pagination=cursor&limit=2")
+    assert ids == newest_first(recipes)
+    assert pages == 3
+
+
+def test_next_links_keep_filters(make_recipes):
+    other = CustomUser.objects.create(username="other",
+                                      email="other@example.com")
+    recipes = make_recipes(3, ingredients_per_recipe=1)
+    make_recipes(2, author=other, ingredients_per_recipe=1)
+    ids, _ = read_pages(
+        APIClient(),
+        "/api/recipes/?pagination=cursor&limit=1"
+        f"&author={recipes[0].author_id}",
+    )
+    assert ids == newest_first(recipes)
+
+
+def test_page_number_pagination_is_default(make_recipes):
+    make_recipes(3, ingredients_per_recipe=1)
+    data = APIClient().get("/api/recipes/?limit=2").json()
+    assert data["count"] == 3
+    assert "page=2" in data["next"]
+
+
+def test_invalid_cursor():
+    response = APIClient().get("/api/recipes/?pagination=cursor&cursor=bad")
+    assert response.status_code == 404
@@ -0,0 +1,133 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes import feeds
+from recipes.models import FeedEntry
+from users.models import CustomUser, Follow
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def authors():
+    return [
+        CustomUser.objects.create(username=f"author{i}",
+                                  email=f"author{i}@example.com")
+        for i in range(2)
+    ]
+
+
+def read_feed(client, limit):
+    """id рецептов ленты, полученные постранично."""
+    recipe_ids, url = [], f"/api/recipes/feed/?limit={limit}"
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        recipe_ids += [recipe["id"] for recipe in response.data["results"]]
+        url = response.data["next"]
+    return recipe_ids
+
+
+def newest_first(recipes):
+    return [
+        recipe.id for recipe in sorted(
+            recipes, key=lambda recipe: (recipe.pub_date, recipe.id),
+            reverse=True,
+        )
+    ]
+
+
+@pytest.mark.parametrize("fanout_limit", (1000, 0))
+def test_feed_merges_followed_authors(settings, user, user_client, authors,
+                                      make_recipes, fanout_limit):
+    """Лента одинакова для раскладки по лентам и чтения при запросе."""
+    settings.FEED_FANOUT_LIMIT = fanout_limit
+    old = make_recipes(2, author=authors[0])
+    for author in authors:
+        Follow.objects.create(user=user, author=author)
+    new = (make_recipes(3, author=authors[1])
+           + make_recipes(2, author=authors[0]))
+    other = CustomUser.objects.create(username="other",
+                                      email="other@example.com")
+    make_recipes(2, author=other)
+
+    assert read_feed(user_client, limit=2) == newest_first(old + new)
+    assert FeedEntry.objects.filter(user=user).exists() == bool(fanout_limit)
+
+
+def test_unfollow_removes_author_recipes(user, user_client, authors,
+                                         make_recipes):
+    recipes = make_recipes(2, author=authors[0])
+    make_recipes(2, author=authors[1])
+    Follow.objects.create(user=user, author=authors[0])
+    follow = Follow.objects.create(user=user, author=authors[1])
+    follow.delete()
+    assert read_feed(user_client, limit=10) == newest_first(recipes)
+    assert not FeedEntry.objects.filter(author=authors[1]).exists()
+
+
+def test_feed_is_trimmed(settings, user, user_client, authors,
+                         make_recipes):
+    settings.FEED_MAX_LENGTH = 3
+    Follow.objects.create(user=user, author=authors[0])
+    recipes = make_recipes(5, author=authors[0])
+    assert FeedEntry.objects.filter(user=user).count() == 3
+    assert read_feed(user_client, limit=10) == newest_first(recipes)[:3]
+
+
+def test_only_full_feeds_are_trimmed(settings, user, authors, make_recipes):
+    settings.FEED_MAX_LENGTH = 3
+    Follow.objects.create(user=user, author=authors[0])
+    Follow.objects.create(user=authors[1], author=authors[0])
+    make_recipes(2, author=authors[0])
+    FeedEntry.objects.filter(user=authors[1]).delete()
+
+    with CaptureQueriesContext(connection) as context:
+        make_recipes(1, author=authors[0])
+    assert not any(
+        query["sql"].startswith("DELETE") for query in context.captured_queries
+    )
+
+    make_recipes(1, author=authors[0])
+    assert FeedEntry.objects.filter(user=user).count() == 3
+    assert FeedEntry.objects.filter(user=authors[1]).count() == 2
+
+
+def test_rebuild_restores_feeds(user, authors, make_recipes):
+    Follow.objects.create(user=user, author=authors[0])
+    recipes = make_recipes(2, author=authors[0])
+    FeedEntry.objects.all().delete()
+    CustomUser.objects.update(followers_count=0)
+    assert feeds.rebuild() == 2
+    assert set(FeedEntry.objects.values_list("recipe_id", flat=True)) == {
+        recipe.id for recipe in recipes
+    }
+    authors[0].refresh_from_db()
+    assert authors[0].followers_count == 1
+
+
+def test_feed_requires_authentication():
+    assert APIClient().get("/api/recipes/feed/").status_code == 401
+
+
+def test_invalid_cursor(user_client):
+    response = user_client.get("/api/recipes/feed/?cursor=broken")
+    assert response.status_code == 404
+
+
+def test_author_crossing_fanout_limit(settings, user, user_client, authors,
+                                      make_recipes):
+    settings.FEED_FANOUT_LIMIT = 1
+    recipes = make_recipes(2, author=authors[0])
+    Follow.objects.create(user=user, author=authors[0])
+    assert FeedEntry.objects.filter(author=authors[0]).count() == 2
+
+    follow = Follow.objects.create(user=authors[1], author=authors[0])
+    assert not FeedEntry.objects.filter(author=authors[0]).exists()
+    assert read_feed(user_client, limit=1) == newest_first(recipes)
+
+    follow.delete()
+    assert FeedEntry.objects.filter(author=authors[0]).count() == 2
+    assert read_feed(user_client, limit=1) == newest_first(recipes)
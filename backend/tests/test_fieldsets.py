@@ -0,0 +1,58 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+
+def test_recipe_list_returns_requested_fields(user_client, make_recipes):
+    make_recipes(2)
+    response = user_client.get(
+        "/api/recipes/?fields=id,name,author.username")
+    assert response.status_code == 200
+    for recipe in response.data["results"]:
+        assert set(recipe) == {"id", "name", "author"}
+        assert set(recipe["author"]) == {"username"}
+
+
+def test_unexpanded_relations_collapse_to_ids(user, user_client,
+                                              make_recipes, tags,
+                                              ingredients):
+    make_recipes(1)
+    response = user_client.get("/api/recipes/?expand=tags")
+    listed, = response.data["results"]
+    assert listed["author"] == user.id
+    assert sorted(listed["ingredients"]) == [
+        ingredient.id for ingredient in ingredients[:3]
+    ]
+    assert [tag["slug"] for tag in listed["tags"]] == [
+        tag.slug for tag in tags[:2]
+    ]
+
+
+def test_full_response_without_parameters(user_client, make_recipes):
+    make_recipes(1)
+    listed, = user_client.get("/api/recipes/").data["results"]
+    assert {
+        "id", "tags", "author", "ingredients", "is_favorited",
+        "is_in_shopping_cart", "name", "image", "text", "cooking_time",
+    } <= set(listed)
+    assert isinstance(listed["author"], dict)
+
+
+def test_card_fields_skip_relations(user_client, make_recipes,
+                                    django_assert_max_num_queries):
+    make_recipes(5)
+    user_client.get("/api/recipes/?limit=1")
+    with django_assert_max_num_queries(2):
+        response = user_client.get(
+            "/api/recipes/?fields=id,name,image,cooking_time")
+    assert response.status_code == 200
+    assert all(
+        set(recipe) == {"id", "name", "image", "cooking_time"}
+        for recipe in response.data["results"]
+    )
+
+
+def test_user_fields(user, user_client):
+    response = user_client.get(f"/api/users/{user.id}/?fields=id,email")
+    assert response.status_code == 200
+    assert response.data == {"id": user.id, "email": user.email}
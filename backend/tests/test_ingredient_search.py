@@ -0,0 +1,54 @@
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredients, MeasureUnits
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/ingredients/"
+
+
+@pytest.fixture
+def catalog():
+    unit = MeasureUnits.objects.create(name="г")
+    Ingredients.objects.bulk_create(
+        Ingredients(name=name, measurement_unit=unit)
+        for name in (
+            "сахарная пудра", "ванильный сахар", "сахар", "тростниковый сахар",
+            "соль",
+        )
+    )
+
+
+def search(**params):
+    response = APIClient().get(URL, params)
+    assert response.status_code == 200
+    return [ingredient["name"] for ingredient in response.json()]
+
+
+def test_prefix_matches_come_first(catalog):
+    names = search(name="сахар")
+    assert sorted(names[:2]) == ["сахар", "сахарная пудра"]
+    assert sorted(names[2:]) == ["ванильный сахар", "тростниковый сахар"]
+
+
+def test_search_ignores_case(catalog):
+    assert sorted(search(name=" Соль ")) == ["соль"]
+
+
+def test_results_are_capped(settings, catalog):
+    settings.INGREDIENTS_SEARCH_LIMIT = 3
+    names = search(name="сахар")
+    assert len(names) == 3
+    assert sorted(names[:2]) == ["сахар", "сахарная пудра"]
+
+    settings.INGREDIENTS_SEARCH_LIMIT = 1
+    names = search(name="сах")
+    assert len(names) == 1
+    assert names[0] in ("сахар", "сахарная пудра")
+
+
+@pytest.mark.parametrize("params", ({}, {"name": ""}, {"name": "  "}))
+def test_empty_name_is_capped(settings, catalog, params):
+    settings.INGREDIENTS_SEARCH_LIMIT = 2
+    assert len(search(**params)) == 2
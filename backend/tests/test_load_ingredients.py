@@ -0,0 +1,95 @@
+import io
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from recipes.management.commands.load_ingredients import iter_json_array
+from recipes.models import Ingredients
+
+pytestmark = pytest.mark.django_db
+
+ROWS = [
+    ("name", "measurement_unit"),
+    ("абрикос", "г"),
+    ("банан", "шт."),
+    ("вишня", "г"),
+    ("гвоздика", ""),
+    ("банан", "шт."),
+]
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "ingredients.csv"
+    path.write_text(
+        "\n".join(",".join(row) for row in ROWS), encoding="utf-8"
+    )
+    return path
+
+
+def load(path, **options):
+    stderr = io.StringIO()
+    call_command("load_ingredients", path=str(path),
+                 stdout=io.StringIO(), stderr=stderr, **options)
+    return stderr.getvalue()
+
+
+def stored():
+    return sorted(
+        Ingredients.objects.values_list("name", "measurement_unit__name")
+    )
+
+
+def test_load_is_idempotent_and_skips_rows_without_unit(csv_file):
+    stderr = load(csv_file)
+    expected = [("абрикос", "г"), ("банан", "шт."), ("вишня", "г")]
+    assert stored() == expected
+    assert "Пропущено строк без единицы измерения: 1" in stderr
+
+    load(csv_file)
+    assert stored() == expected
+
+
+def test_batch_size_does_not_change_result(csv_file):
+    load(csv_file, batch_size=1)
+    by_one = stored()
+    Ingredients.objects.all().delete()
+
+    load(csv_file)
+    assert stored() == by_one
+
+
+def test_batch_size_must_be_positive(csv_file):
+    with pytest.raises(CommandError):
+        load(csv_file, batch_size=0)
+
+
+def test_json_file_is_loaded(tmp_path):
+    path = tmp_path / "ingredients.json"
+    path.write_text(json.dumps([
+        {"name": name, "measurement_unit": unit} for name, unit in ROWS[1:]
+    ], ensure_ascii=False), encoding="utf-8")
+
+    load(path)
+    assert stored() == [
+        ("абрикос", "г"), ("банан", "шт."), ("вишня", "г")
+    ]
+
+
+def test_json_array_is_read_in_chunks():
+    items = [{"name": f"ингредиент {i}", "amount": 10 ** i}
+             for i in range(5)]
+    data = io.StringIO(json.dumps(items, ensure_ascii=False))
+    assert list(iter_json_array(data, chunk_size=7)) == items
+
+    numbers = io.StringIO("[12345, 678]")
+    assert list(iter_json_array(numbers, chunk_size=3)) == [12345, 678]
+
+
+@pytest.mark.parametrize(
+    "content", ['{"name": "соль"}', '[{"name": "соль"}', '[{"name": ]']
+)
+def test_invalid_json_is_rejected(content):
+    with pytest.raises(CommandError):
+        list(iter_json_array(io.StringIO(content), chunk_size=4))
@@ -0,0 +1,184 @@
+import random
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+
+from api.cache import versioned_cache
+from api.search import (
+    IngredientIndex,
+    RankedMatches,
+    drop_highest_bits,
+    ingredient_index,
+    popcount,
+    to_mask
+)
+from recipes.models import RecipeIngredients
+
+
+def brute_force(ingredient_sets, have):
+    """Ожидаемый порядок подбора: (id рецепта, найдено, всего)."""
+    matches = [
+        (recipe_id, len(ingredients & have), len(ingredients))
+        for recipe_id, ingredients in ingredient_sets.items()
+        if ingredients & have
+    ]
+    return sorted(
+        matches,
+        key=lambda match: (match[1] / match[2], match[1], match[0]),
+        reverse=True,
+    )
+
+
+def ranked_matches(ingredient_sets, have):
+    masks = [
+        to_mask(sorted(
+            recipe_id for recipe_id, ingredients in ingredient_sets.items()
+            if ingredient_id in ingredients
+        ))
+        for ingredient_id in have
+    ]
+    by_size = {}
+    for recipe_id, ingredients in ingredient_sets.items():
+        size = len(ingredients)
+        by_size[size] = by_size.get(size, 0) | 1 << recipe_id
+    return RankedMatches(masks, by_size)
+
+
+def test_popcount_and_drop_highest_bits():
+    assert popcount(0) == 0
+    assert popcount(0b1011) == 3
+    assert popcount(1 << 1000 | 1) == 2
+    assert drop_highest_bits(0b11011, 2) == 0b011
+    assert drop_highest_bits(0b11011, 10) == 0
+
+
+def test_counts_above_counter_width_match_nothing():
+    # Маски не пересекаются: у счетчика один разряд.
+    matches = ranked_matches(
+        {1: {1}, 2: {2}, 3: {3}, 4: {1, 5, 6}, 5: {7, 8, 9}}, {1, 2, 3},
+    )
+    assert len(matches.counter) == 1
+    assert matches.with_count(2) == 0
+    assert matches.with_count(3) == 0
+    assert matches[0:10] == [(3, 1, 1), (2, 1, 1), (1, 1, 1), (4, 1, 3)]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_ranked_matches_agree_with_brute_force(seed):
+    rng = random.Random(seed)
+    ingredient_sets = {
+        recipe_id: set(rng.sample(range(12), rng.randint(1, 6)))
+        for recipe_id in rng.sample(range(1, 300), rng.randint(1, 60))
+    }
+    have = set(rng.sample(range(12), rng.randint(1, 8)))
+    matches = ranked_matches(ingredient_sets, have)
+    expected = brute_force(ingredient_sets, have)
+    assert len(matches) == len(expected)
+    assert matches[0:len(expected) + 5] == expected
+    for limit in (1, 3, 7):
+        for start in range(0, len(expected) + limit, limit):
+            assert matches[start:start + limit] == expected[
+                start:start + limit]
+
+
+@pytest.mark.django_db
+def test_match_endpoint_pages_agree_with_brute_force(user_client,
+                                                     make_recipes,
+                                                     ingredients):
+    rng = random.Random(0)
+    ingredient_sets = {}
+    for recipe in make_recipes(15, ingredients_per_recipe=0):
+        chosen = rng.sample(ingredients, rng.randint(1, 5))
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(recipe=recipe, ingredient=ingredient,
+                              amount=10)
+            for ingredient in chosen
+        )
+        ingredient_sets[recipe.id] = {ingredient.id for ingredient in chosen}
+    have = {ingredient.id for ingredient in ingredients[:4]}
+    expected = brute_force(ingredient_sets, have)
+    query = ",".join(map(str, have))
+
+    results, page = [], 1
+    while True:
+        response = user_client.get(
+            f"/api/recipes/match/?ingredients={query}&limit=4&page={page}",
+        )
+        assert response.status_code == 200
+        results += response.data["results"]
+        if response.data["next"] is None:
+            break
+        page += 1
+
+    assert response.data["count"] == len(expected)
+    assert [
+        (recipe["id"], recipe["coverage"]) for recipe in results
+    ] == [
+        (recipe_id, round(count / total, 4))
+        for recipe_id, count, total in expected
+    ]
+    for recipe in results:
+        assert {
+            ingredient["id"] for ingredient in recipe["missing_ingredients"]
+        } == ingredient_sets[recipe["id"]] - have
+
+
+@pytest.fixture
+def worker():
+    """Индекс другого процесса, считающий полные перестроения."""
+    index = IngredientIndex()
+    with mock.patch.object(index, "rebuild", wraps=index.rebuild):
+        yield index
+
+
+def matched_ids(index, ingredient_ids):
+    matches = index.match(ingredient_ids)
+    return [recipe_id for recipe_id, _, _ in matches[0:len(matches)]]
+
+
+def change_composition(recipe, ingredients):
+    ingredient_ids = {ingredient.id for ingredient in ingredients} | set(
+        RecipeIngredients.objects.filter(recipe=recipe)
+        .values_list("ingredient_id", flat=True)
+    )
+    RecipeIngredients.objects.filter(recipe=recipe).delete()
+    RecipeIngredients.objects.bulk_create(
+        RecipeIngredients(recipe=recipe, ingredient=ingredient, amount=10)
+        for ingredient in ingredients
+    )
+    ingredient_index.update(recipe.pk, ingredient_ids)
+
+
+@pytest.mark.django_db
+def test_index_changes_are_published_on_commit(
+        make_recipes, ingredients, worker, django_capture_on_commit_callbacks):
+    recipe, = make_recipes(1, ingredients_per_recipe=1)
+    assert matched_ids(worker, [ingredients[5].id]) == []
+    version = versioned_cache.version(ingredient_index.namespace)
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        change_composition(recipe, ingredients[5:7])
+    assert versioned_cache.version(ingredient_index.namespace) == version
+    assert matched_ids(worker, [ingredients[5].id]) == []
+
+    for callback in callbacks:
+        callback()
+    assert matched_ids(worker, [ingredients[5].id]) == [recipe.id]
+    assert matched_ids(worker, [ingredients[0].id]) == []
+    assert worker.rebuild.call_count == 1
+
+
+@pytest.mark.django_db
+def test_index_rebuilds_when_change_log_is_incomplete(
+        make_recipes, ingredients, worker, django_capture_on_commit_callbacks):
+    recipe, = make_recipes(1, ingredients_per_recipe=1)
+    assert matched_ids(worker, [ingredients[5].id]) == []
+    version = versioned_cache.version(ingredient_index.namespace)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        change_composition(recipe, ingredients[5:7])
+    cache.delete(ingredient_index.change_key(version + 1))
+
+    assert matched_ids(worker, [ingredients[5].id]) == [recipe.id]
+    assert worker.rebuild.call_count == 2
@@ -0,0 +1,185 @@
+import io
+
+import pytest
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from api.benchmark import IMAGE, SyntheticDataset
+from api.urls import v1_router as api_router
+from users.urls import router as users_router
+
+pytestmark = pytest.mark.django_db
+
+# Количество SQL-запросов на один запрос к эндпоинту, измеренное
+# на синтетических данных. Списки запрашиваются с limit=PAGE_LIMIT,
+# поэтому N+1 сразу превышает бюджет.
+QUERY_BUDGETS = {
+    "tags-list": 1,
+    "tags-detail": 1,
+    "ingredients-list": 1,
+    "ingredients-detail": 1,
+    "recipes-list": 5,
+    "recipes-list-anonymous": 4,
+    "recipes-list-cards": 2,
+    "recipes-list-cursor": 3,
+    "recipes-list-popular": 4,
+    "recipes-list-filtered": 4,
+    "recipes-list-not-modified": 2,
+    "recipes-feed": 5,
+    # Первый запрос строит индекс ингредиентов (+2 запроса).
+    "recipes-match": 4,
+    "recipes-search": 6,
+    "recipes-detail": 3,
+    "recipes-detail-cached": 0,
+    "recipes-create": 19,
+    "recipes-update": 15,
+    "recipes-delete": 9,
+    "recipes-favorite-add": 5,
+    "recipes-favorite-remove": 4,
+    "recipes-shopping-cart-add": 11,
+    "recipes-shopping-cart-remove": 9,
+    "recipes-download-shopping-cart": 1,
+    "recipes-download-shopping-cart-txt": 1,
+    "recipes-download-shopping-cart-job": 1,
+    "recipes-shopping-cart-job": 1,
+    "recipes-shopping-cart-ingredients": 1,
+    "users-list": 2,
+    "users-detail": 1,
+    "users-me": 0,
+    "users-create": 4,
+    "users-subscriptions": 3,
+    # Подписка и отписка обновляют счетчик подписчиков и ленту.
+    "users-subscribe": 11,
+    "users-unsubscribe": 6,
+    "users-set-password": 1,
+    "auth-token-login": 6,
+    "auth-token-logout": 2,
+}
+
+# Маршруты djoser для управления учетной записью без бюджета.
+UNMEASURED_ROUTES = {
+    ("users-activation", "post"),
+    ("users-resend-activation", "post"),
+    ("users-reset-password", "post"),
+    ("users-reset-password-confirm", "post"),
+    ("users-reset-username", "post"),
+    ("users-reset-username-confirm", "post"),
+    ("users-set-username", "post"),
+    ("users-me", "patch"),
+    ("users-me", "delete"),
+    ("users-detail", "patch"),
+    ("users-detail", "delete"),
+}
+
+
+@pytest.fixture(scope="module")
+def endpoint_queries(django_db_setup, django_db_blocker, tmp_path_factory):
+    """Количество SQL-запросов каждого эндпоинта на синтетических данных.
+
+    Данные создаются один раз на модуль и удаляются откатом транзакции.
+    """
+    dataset = SyntheticDataset(io.StringIO())
+    media_root = tmp_path_factory.mktemp("media")
+    results = {}
+    with django_db_blocker.unblock(), override_settings(MEDIA_ROOT=media_root):
+        with transaction.atomic():
+            dataset.create(users_count=50, recipes_count=200, follows=5,
+                           favorites=5, carts=3)
+            dataset.warm_up()
+            for name, prepare, request in dataset.endpoints():
+                queries, _, responses = dataset.measure(prepare, request,
+                                                        repeat=2)
+                results[name] = (queries, responses)
+            transaction.set_rollback(True)
+    cache.clear()
+    return results
+
+
+def router_routes():
+    """Пары (имя маршрута, метод) эндпоинтов из роутеров API."""
+    for router in (api_router, users_router):
+        for pattern in router.get_urls():
+            for method in getattr(pattern.callback, "actions", {}):
+                route = (pattern.name, method)
+                if method != "put" and route not in UNMEASURED_ROUTES:
+                    yield route
+
+
+def test_query_budgets_cover_all_endpoints(endpoint_queries):
+    assert set(endpoint_queries) == set(QUERY_BUDGETS)
+    measured = {
+        (response.resolver_match.url_name,
+         response.wsgi_request.method.lower())
+        for _, responses in endpoint_queries.values()
+        for response in responses
+    }
+    assert set(router_routes()) - measured == set()
+
+
+@pytest.mark.parametrize("name", sorted(QUERY_BUDGETS))
+def test_endpoint_query_budget(endpoint_queries, name):
+    queries, responses = endpoint_queries[name]
+    assert all(response.status_code < 400 for response in responses)
+    assert queries <= QUERY_BUDGETS[name]
+
+
+@pytest.mark.parametrize("limit", (2, 20))
+def test_recipe_list_queries_do_not_depend_on_page_size(
+        user_client, make_recipes, django_assert_num_queries, limit):
+    make_recipes(20)
+    # Первый запрос прогревает кэши процесса и справочников.
+    user_client.get("/api/recipes/?limit=1")
+    with django_assert_num_queries(4):
+        response = user_client.get(f"/api/recipes/?limit={limit}")
+    assert response.status_code == 200
+    assert len(response.data["results"]) == limit
+    assert all(
+        len(recipe["ingredients"]) == 3 and len(recipe["tags"]) == 2
+        for recipe in response.data["results"]
+    )
+
+
+def test_recipe_detail_queries(user_client, make_recipes,
+                               django_assert_num_queries):
+    recipe, = make_recipes(1)
+    user_client.get("/api/recipes/?limit=1")
+    with django_assert_num_queries(3):
+        response = user_client.get(f"/api/recipes/{recipe.id}/")
+    assert response.status_code == 200
+    assert len(response.json()["ingredients"]) == 3
+
+
+@pytest.fixture
+def count_write_queries(user_client, make_recipes, tags, ingredients):
+    """Запросы на создание и изменение рецепта с n тегами и ингредиентами."""
+    def count(size):
+        payload = {
+            "name": "Рецепт",
+            "text": "Описание",
+            "cooking_time": 10,
+            "image": IMAGE,
+            "tags": [tag.id for tag in tags[:size]],
+            "ingredients": [
+                {"id": ingredient.id, "amount": 10}
+                for ingredient in ingredients[:size * 3]
+            ],
+        }
+        with CaptureQueriesContext(connection) as created:
+            response = user_client.post("/api/recipes/", payload,
+                                        format="json")
+        assert response.status_code == 201, response.data
+        recipe, = make_recipes(1, ingredients_per_recipe=0)
+        with CaptureQueriesContext(connection) as updated:
+            response = user_client.patch(f"/api/recipes/{recipe.id}/",
+                                         payload, format="json")
+        assert response.status_code == 200, response.data
+        return len(created), len(updated)
+    return count
+
+
+def test_recipe_write_queries_do_not_depend_on_ingredients(
+        user_client, count_write_queries):
+    user_client.get("/api/recipes/?limit=1")
+    count_write_queries(1)
+    assert count_write_queries(1) == count_write_queries(3)
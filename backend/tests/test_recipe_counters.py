@@ -0,0 +1,59 @@
+import pytest
+
+from recipes.models import FavoriteList, Recipes, ShoppingCart
+from users.models import CustomUser
+
+pytestmark = pytest.mark.django_db
+
+
+def counters(recipe):
+    recipe.refresh_from_db()
+    return recipe.favorites_count, recipe.in_carts_count
+
+
+def test_counters_follow_favorites_and_cart(user_client, make_recipes):
+    recipe, = make_recipes(1)
+    assert counters(recipe) == (0, 0)
+
+    user_client.post(f"/api/recipes/{recipe.id}/favorite/")
+    user_client.post(f"/api/recipes/{recipe.id}/shopping_cart/")
+    assert counters(recipe) == (1, 1)
+
+    user_client.delete(f"/api/recipes/{recipe.id}/favorite/")
+    assert counters(recipe) == (0, 1)
+    user_client.delete(f"/api/recipes/{recipe.id}/shopping_cart/")
+    assert counters(recipe) == (0, 0)
+
+
+def test_counters_follow_cascade_deletes(make_recipes):
+    recipe, = make_recipes(1)
+    users = [
+        CustomUser.objects.create(username=f"fan{i}",
+                                  email=f"fan{i}@example.com")
+        for i in range(2)
+    ]
+    for fan in users:
+        FavoriteList.objects.create(user=fan, recipe=recipe)
+        ShoppingCart.objects.create(user=fan, recipe=recipe)
+    assert counters(recipe) == (2, 2)
+
+    users[0].delete()
+    assert counters(recipe) == (1, 1)
+
+
+def test_counter_ordering_breaks_ties_by_date(user_client, make_recipes):
+    recipes = make_recipes(4)
+    FavoriteList.objects.create(user=recipes[0].author, recipe=recipes[1])
+    expected = [recipes[1].id] + [
+        recipe.id for recipe in sorted(
+            (recipes[0], recipes[2], recipes[3]),
+            key=lambda recipe: (recipe.pub_date, recipe.id), reverse=True,
+        )
+    ]
+    ids = []
+    for page in (1, 2):
+        response = user_client.get(
+            f"/api/recipes/?ordering=-favorites_count&limit=2&page={page}")
+        ids += [recipe["id"] for recipe in response.data["results"]]
+    assert ids == expected
+    assert Recipes.objects.count() == len(ids)
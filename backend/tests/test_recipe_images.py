@@ -0,0 +1,62 @@
+import base64
+import io
+
+import pytest
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from recipes.images import image_extension, thumbnail_name
+from recipes.models import Recipes
+
+pytestmark = pytest.mark.django_db
+
+
+def encode(size=(40, 30), image_format="PNG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "red").save(buffer, format=image_format)
+    data = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/{image_format.lower()};base64,{data}"
+
+
+def test_image_is_reencoded_with_thumbnails(settings, create_recipe,
+                                            user_client):
+    response = create_recipe(image=encode(image_format="JPEG"))
+    assert response.status_code == 201, response.data
+    image = Recipes.objects.get(pk=response.data["id"]).image
+    assert image.name.endswith(f".{image_extension()}")
+    for size, (width, height) in settings.RECIPE_THUMBNAIL_SIZES.items():
+        name = thumbnail_name(image.name, size)
+        assert default_storage.exists(name)
+        with default_storage.open(name) as file, Image.open(file) as thumb:
+            assert thumb.width <= width and thumb.height <= height
+
+    listed, = user_client.get("/api/recipes/").data["results"]
+    assert listed["image"].endswith(
+        thumbnail_name(image.name, settings.RECIPE_LIST_THUMBNAIL))
+    detail = user_client.get(f"/api/recipes/{response.data['id']}/").json()
+    assert detail["image"].endswith(image.name)
+
+
+@pytest.mark.parametrize("image", (
+    "data:image/png;base64,not-base64!",
+    base64.b64encode(b"not an image").decode(),
+    123,
+))
+def test_invalid_image_is_rejected(create_recipe, image):
+    response = create_recipe(image=image)
+    assert response.status_code == 400
+    assert "image" in response.data
+
+
+def test_image_size_is_limited(settings, create_recipe):
+    settings.RECIPE_IMAGE_MAX_SIZE = 100
+    response = create_recipe(image=encode(size=(200, 200)))
+    assert response.status_code == 400
+    assert "image" in response.data
+
+
+def test_image_dimensions_are_limited(settings, create_recipe):
+    settings.RECIPE_IMAGE_MAX_DIMENSION = 20
+    response = create_recipe(image=encode(size=(40, 10)))
+    assert response.status_code == 400
+    assert "image" in response.data
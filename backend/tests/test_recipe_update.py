@@ -0,0 +1,71 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import RecipeIngredients, RecipeTags
+
+pytestmark = pytest.mark.django_db
+
+
+def test_update_changes_only_differing_links(user_client, make_recipes, tags,
+                                             ingredients, recipe_payload):
+    recipe, = make_recipes(1)
+    links = {
+        link.ingredient_id: link
+        for link in RecipeIngredients.objects.filter(recipe=recipe)
+    }
+    kept_tag = RecipeTags.objects.get(recipe=recipe, tag=tags[0])
+    payload = {
+        **recipe_payload,
+        "tags": [tags[0].id, tags[2].id],
+        "ingredients": [
+            {"id": ingredients[0].id, "amount": 10},
+            {"id": ingredients[1].id, "amount": 25},
+            {"id": ingredients[5].id, "amount": 5},
+        ],
+    }
+
+    response = user_client.patch(f"/api/recipes/{recipe.id}/", payload,
+                                 format="json")
+
+    assert response.status_code == 200, response.data
+    current = {
+        link.ingredient_id: link
+        for link in RecipeIngredients.objects.filter(recipe=recipe)
+    }
+    assert set(current) == {
+        ingredients[0].id, ingredients[1].id, ingredients[5].id,
+    }
+    # Неизмененные и измененные связи обновляются на месте.
+    assert current[ingredients[0].id].pk == links[ingredients[0].id].pk
+    assert current[ingredients[1].id].pk == links[ingredients[1].id].pk
+    assert current[ingredients[1].id].amount == 25
+    assert current[ingredients[5].id].amount == 5
+    assert set(RecipeTags.objects.filter(recipe=recipe).values_list(
+        "tag_id", flat=True)) == {tags[0].id, tags[2].id}
+    assert RecipeTags.objects.get(recipe=recipe, tag=tags[0]).pk == (
+        kept_tag.pk)
+
+
+def test_update_without_changes_writes_no_links(user_client, make_recipes,
+                                                tags, ingredients,
+                                                recipe_payload):
+    recipe, = make_recipes(1)
+    payload = {
+        **recipe_payload,
+        "tags": [tag.id for tag in tags[:2]],
+        "ingredients": [
+            {"id": ingredient.id, "amount": 10}
+            for ingredient in ingredients[:3]
+        ],
+    }
+    with CaptureQueriesContext(connection) as captured:
+        response = user_client.patch(f"/api/recipes/{recipe.id}/", payload,
+                                     format="json")
+    assert response.status_code == 200, response.data
+    tables = (RecipeIngredients._meta.db_table, RecipeTags._meta.db_table)
+    assert not [
+        query["sql"] for query in captured
+        if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+        and any(table in query["sql"] for table in tables)
+    ]
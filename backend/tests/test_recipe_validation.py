@@ -0,0 +1,46 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize("value", (
+    [{"id": 1}],
+    [[1]],
+    ["abc"],
+    [None],
+))
+def test_invalid_tag_ids_are_reported(create_recipe, value):
+    response = create_recipe(tags=value)
+    assert response.status_code == 400
+    assert list(response.data) == ["tags"]
+
+
+@pytest.mark.parametrize("value", (
+    [[{"id": 1}]],
+    [{"id": [1], "amount": 10}],
+    [{"id": {"id": 1}, "amount": 10}],
+    ["1"],
+))
+def test_invalid_ingredient_ids_are_reported(create_recipe, value):
+    response = create_recipe(ingredients=value)
+    assert response.status_code == 400
+    assert list(response.data) == ["ingredients"]
+
+
+def test_tag_and_ingredient_errors_are_combined(create_recipe,
+                                                recipe_payload, ingredients):
+    response = create_recipe(tags=[[1], 1000],
+                             ingredients=recipe_payload["ingredients"] * 2)
+    assert response.status_code == 400
+    assert set(response.data) == {"tags", "ingredients"}
+    assert response.data["ingredients"] == [
+        f"Ингредиент с 'id' {ingredients[0].id} уже был передан",
+    ]
+
+
+def test_valid_recipe_is_created(create_recipe, tags):
+    response = create_recipe(tags=[str(tags[0].id), tags[1].id])
+    assert response.status_code == 201, response.data
+    assert [tag["id"] for tag in response.data["tags"]] == [
+        tags[0].id, tags[1].id,
+    ]
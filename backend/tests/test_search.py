@@ -0,0 +1,65 @@
+import pytest
+
+from recipes.models import Ingredients, MeasureUnits, RecipeIngredients
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def add_recipe(make_recipes):
+    """Рецепт с заданными названием, описанием и ингредиентами."""
+    unit = MeasureUnits.objects.create(name="шт")
+
+    def add(name, text="Описание", ingredient_names=()):
+        recipe, = make_recipes(1, ingredients_per_recipe=0,
+                               name=name, text=text)
+        for ingredient_name in ingredient_names:
+            ingredient, _ = Ingredients.objects.get_or_create(
+                name=ingredient_name, measurement_unit=unit,
+            )
+            RecipeIngredients.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=1,
+            )
+        return recipe
+    return add
+
+
+def search(client, query):
+    response = client.get("/api/recipes/", {"search": query})
+    assert response.status_code == 200
+    return [recipe["id"] for recipe in response.data["results"]]
+
+
+def test_search_ranks_name_above_ingredients_and_text(user_client,
+                                                      add_recipe):
+    in_text = add_recipe("Салат", text="Подавать с томатами")
+    in_name = add_recipe("Томатный суп с томатами")
+    in_ingredients = add_recipe("Паста", ingredient_names=["томат"])
+    add_recipe("Каша")
+
+    assert search(user_client, "томаты") == [
+        in_name.id, in_ingredients.id, in_text.id,
+    ]
+
+
+def test_search_requires_every_word(user_client, add_recipe):
+    both = add_recipe("Суп", ingredient_names=["картофель"])
+    add_recipe("Суп гороховый")
+    assert search(user_client, "суп картофеля") == [both.id]
+    assert search(user_client, "борщ") == []
+
+
+def test_search_sees_changes_after_commit(
+        user_client, add_recipe, django_capture_on_commit_callbacks):
+    recipe = add_recipe("Паста", ingredient_names=["томат"])
+    assert search(user_client, "томат") == [recipe.id]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        ingredient = Ingredients.objects.get(name="томат")
+        ingredient.name = "базилик"
+        ingredient.save()
+        recipe.name = "Лазанья"
+        recipe.save()
+
+    assert search(user_client, "томат") == []
+    assert search(user_client, "лазанья базилик") == [recipe.id]
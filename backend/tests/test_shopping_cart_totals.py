@@ -0,0 +1,69 @@
+import io
+from collections import Counter
+
+import pytest
+from django.core.management import call_command
+
+from recipes.models import (
+    RecipeIngredients,
+    ShoppingCart,
+    ShoppingCartIngredients
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def stored_totals(user):
+    return dict(ShoppingCartIngredients.objects.filter(user=user)
+                .values_list("ingredient_id", "amount"))
+
+
+def expected_totals(user):
+    totals = Counter()
+    for ingredient_id, amount in RecipeIngredients.objects.filter(
+            recipe__shopping_cart_recipe__user=user,
+    ).values_list("ingredient_id", "amount"):
+        totals[ingredient_id] += amount
+    return dict(totals)
+
+
+@pytest.fixture
+def recipes(make_recipes, ingredients):
+    first, second = make_recipes(2)
+    RecipeIngredients.objects.filter(
+        recipe=second, ingredient=ingredients[0]).update(amount=15)
+    return first, second
+
+
+def test_totals_follow_cart_changes(user, user_client, recipes,
+                                    ingredients, recipe_payload):
+    first, second = recipes
+    for recipe in recipes:
+        user_client.post(f"/api/recipes/{recipe.id}/shopping_cart/")
+    assert stored_totals(user)[ingredients[0].id] == 25
+    assert stored_totals(user) == expected_totals(user)
+
+    response = user_client.patch(f"/api/recipes/{first.id}/", {
+        **recipe_payload,
+        "ingredients": [
+            {"id": ingredients[0].id, "amount": 40},
+            {"id": ingredients[7].id, "amount": 3},
+        ],
+    }, format="json")
+    assert response.status_code == 200, response.data
+    assert stored_totals(user)[ingredients[0].id] == 55
+    assert stored_totals(user) == expected_totals(user)
+
+    user_client.delete(f"/api/recipes/{second.id}/shopping_cart/")
+    assert stored_totals(user) == expected_totals(user)
+
+    first.delete()
+    assert stored_totals(user) == {}
+
+
+def test_totals_are_rebuilt_by_command(user, recipes):
+    for recipe in recipes:
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+    ShoppingCartIngredients.objects.all().delete()
+    call_command("rebuild_shopping_carts", stdout=io.StringIO())
+    assert stored_totals(user) == expected_totals(user)
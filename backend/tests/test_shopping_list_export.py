@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+
+import pytest
+
+from api.reports import format_line
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/recipes/download_shopping_cart/"
+
+
+@pytest.fixture
+def cart(user_client, make_recipes):
+    recipes = make_recipes(2, ingredients_per_recipe=2)
+    for recipe in recipes:
+        response = user_client.post(f"/api/recipes/{recipe.id}/shopping_cart/")
+        assert response.status_code == 201
+    return sorted(
+        (ingredient.name, ingredient.measurement_unit.name, 20)
+        for ingredient in recipes[0].ingredients.all()
+    )
+
+
+def download(client, **kwargs):
+    response = client.get(URL, **kwargs)
+    assert response.status_code == 200
+    content = (
+        b"".join(response.streaming_content) if response.streaming
+        else response.content
+    )
+    return response, content
+
+
+@pytest.mark.parametrize("params, headers, media_type", (
+    ({}, {}, "application/pdf"),
+    ({"format": "txt"}, {}, "text/plain"),
+    ({"format": "csv"}, {}, "text/csv"),
+    ({"format": "json"}, {}, "application/json"),
+    ({}, {"HTTP_ACCEPT": "text/plain"}, "text/plain"),
+    ({}, {"HTTP_ACCEPT": "text/csv"}, "text/csv"),
+    ({}, {"HTTP_ACCEPT": "application/json"}, "application/json"),
+))
+def test_format_is_negotiated(user_client, cart, params, headers,
+                              media_type):
+    response, content = download(user_client, data=params, **headers)
+    assert response["Content-Type"].startswith(media_type)
+    assert "attachment" in response["Content-Disposition"]
+    if media_type == "application/pdf":
+        assert content.startswith(b"%PDF")
+    else:
+        assert response.streaming
+
+
+def test_text_content(user_client, cart):
+    _, content = download(user_client, data={"format": "txt"})
+    assert content.decode().splitlines() == ["Список покупок:"] + [
+        format_line(count, *row) for count, row in enumerate(cart, start=1)
+    ]
+
+
+def test_csv_content(user_client, cart):
+    _, content = download(user_client, data={"format": "csv"})
+    rows = list(csv.reader(io.StringIO(content.decode())))
+    assert rows == [["name", "measurement_unit", "amount"]] + [
+        [name, unit, str(amount)] for name, unit, amount in cart
+    ]
+
+
+def test_json_content(user_client, cart):
+    _, content = download(user_client, data={"format": "json"})
+    assert json.loads(content) == [
+        {"name": name, "measurement_unit": unit, "amount": amount}
+        for name, unit, amount in cart
+    ]
+
+
+def test_empty_cart_json(user_client):
+    _, content = download(user_client, data={"format": "json"})
+    assert json.loads(content) == []
+
+
+def test_unknown_format(user_client):
+    response = user_client.get(URL, {"format": "xml"})
+    assert response.status_code == 404
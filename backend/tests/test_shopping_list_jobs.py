@@ -0,0 +1,141 @@
+import os
+import time
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import jobs
+from recipes.models import ShoppingCart, ShoppingListJob
+from users.models import CustomUser
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def keep_connection():
+    """run_job закрывает соединения, а тест выполняется в транзакции."""
+    with mock.patch.object(jobs.connections, "close_all"):
+        yield
+
+
+@pytest.fixture
+def cart(user, make_recipes):
+    for recipe in make_recipes(2):
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+
+
+def enqueue(client):
+    response = client.get("/api/recipes/download_shopping_cart/?mode=job")
+    assert response.status_code == 202
+    return response.json()
+
+
+def test_job_is_polled_until_redirect_to_file(user_client, cart):
+    job = enqueue(user_client)
+    assert job["status"] == ShoppingListJob.PENDING
+    assert job["url"].endswith(f"/api/recipes/shopping_cart_jobs/{job['id']}/")
+
+    response = user_client.get(job["url"])
+    assert response.status_code == 200
+    assert response.data["status"] == ShoppingListJob.PENDING
+
+    jobs.run_job(job["id"])
+
+    response = user_client.get(job["url"])
+    assert response.status_code == 303
+    file_name = ShoppingListJob.objects.get(pk=job["id"]).file.name
+    assert response["Location"].endswith(file_name)
+    with default_storage.open(file_name) as file:
+        assert file.read(4) == b"%PDF"
+
+
+def test_enqueue_returns_location(user_client, cart):
+    response = user_client.get(
+        "/api/recipes/download_shopping_cart/?mode=job")
+    assert response["Location"] == response.json()["url"]
+
+
+def test_other_users_job_is_not_found(user_client, cart):
+    job = enqueue(user_client)
+    other = CustomUser.objects.create(username="other",
+                                      email="other@example.com")
+    client = APIClient()
+    client.force_authenticate(other)
+    assert client.get(job["url"]).status_code == 404
+
+
+def test_failed_job(user_client, cart):
+    job = enqueue(user_client)
+    with mock.patch.object(jobs, "get_shopping_list_pdf",
+                           side_effect=RuntimeError):
+        jobs.run_job(job["id"])
+    response = user_client.get(job["url"])
+    assert response.status_code == 200
+    assert response.data["status"] == ShoppingListJob.FAILED
+
+
+def test_identical_lists_share_file(user_client, cart):
+    first, second = enqueue(user_client), enqueue(user_client)
+    jobs.run_job(first["id"])
+    jobs.run_job(second["id"])
+    names = {
+        job.file.name for job in ShoppingListJob.objects.all()
+    }
+    assert len(names) == 1
+    _, files = default_storage.listdir(jobs.JOB_FILES_DIR)
+    assert len(files) == 1
+
+
+def test_stale_running_jobs_are_requeued(settings, user):
+    stale, fresh = (
+        ShoppingListJob.objects.create(user=user,
+                                       status=ShoppingListJob.RUNNING)
+        for _ in range(2)
+    )
+    ShoppingListJob.objects.filter(pk=stale.pk).update(
+        created=timezone.now() - timedelta(
+            seconds=settings.SHOPPING_LIST_JOB_TIMEOUT + 1),
+    )
+    assert jobs.requeue_stale_jobs() == 1
+    stale.refresh_from_db()
+    fresh.refresh_from_db()
+    assert stale.status == ShoppingListJob.PENDING
+    assert fresh.status == ShoppingListJob.RUNNING
+
+
+def test_expired_jobs_and_files_are_deleted(settings, user, user_client,
+                                            cart):
+    expired, kept = enqueue(user_client), enqueue(user_client)
+    jobs.run_job(expired["id"])
+    shared_name = ShoppingListJob.objects.get(pk=expired["id"]).file.name
+    orphan_name = default_storage.save(f"{jobs.JOB_FILES_DIR}/orphan.pdf",
+                                       ContentFile(b""))
+    past = time.time() - settings.SHOPPING_LIST_JOB_TTL - 1
+    for name in (shared_name, orphan_name):
+        os.utime(default_storage.path(name), (past, past))
+    ShoppingListJob.objects.filter(pk=expired["id"]).update(
+        created=timezone.now() - timedelta(
+            seconds=settings.SHOPPING_LIST_JOB_TTL + 1),
+    )
+    jobs.run_job(kept["id"])
+
+    assert jobs.delete_expired_jobs() == 1
+    assert [str(job.pk) for job in ShoppingListJob.objects.all()] == [
+        kept["id"],
+    ]
+    # Файл нужен оставшейся задаче с тем же списком покупок.
+    assert default_storage.exists(shared_name)
+    assert not default_storage.exists(orphan_name)
+
+
+def test_command_processes_queue(user, cart):
+    job = ShoppingListJob.objects.create(user=user)
+    call_command("process_shopping_list_jobs", stdout=mock.MagicMock())
+    job.refresh_from_db()
+    assert job.status == ShoppingListJob.DONE
@@ -0,0 +1,60 @@
+import pytest
+
+from users.models import CustomUser, Follow
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/users/subscriptions/"
+
+
+@pytest.fixture
+def authors(user, make_recipes):
+    authors = [
+        CustomUser.objects.create(username=f"author{i}",
+                                  email=f"author{i}@example.com")
+        for i in range(3)
+    ]
+    for number, author in enumerate(authors, start=1):
+        make_recipes(number, author=author, ingredients_per_recipe=1)
+        Follow.objects.create(user=user, author=author)
+    return authors
+
+
+def get(client, url, **params):
+    response = client.get(url, params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_cursor_next_links(user_client, authors):
+    ids, url = [], f"{URL}?pagination=cursor&limit=2"
+    while url:
+        data = get(user_client, url)
+        assert "count" not in data
+        ids += [author["id"] for author in data["results"]]
+        url = data["next"]
+    # От новых подписок к старым.
+    assert ids == [author.id for author in reversed(authors)]
+
+
+@pytest.mark.parametrize("recipes_limit, expected", (
+    ("0", [0, 0, 0]),
+    ("2", [1, 2, 2]),
+    ("5", [1, 2, 3]),
+    ("abc", [1, 2, 3]),
+    ("-1", [1, 2, 3]),
+))
+def test_recipes_limit(user_client, authors, recipes_limit, expected):
+    data = get(user_client, URL, recipes_limit=recipes_limit)
+    results = sorted(data["results"], key=lambda author: author["id"])
+    assert [len(author["recipes"]) for author in results] == expected
+    assert [author["recipes_count"] for author in results] == [1, 2, 3]
+
+
+def test_recipes_limit_keeps_newest(user_client, authors):
+    data = get(user_client, URL, recipes_limit=1)
+    author = next(
+        author for author in data["results"] if author["id"] == authors[2].id
+    )
+    newest = authors[2].recipes.order_by("-pub_date", "-id").first()
+    assert [recipe["id"] for recipe in author["recipes"]] == [newest.id]
@@ -0,0 +1,38 @@
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.models import RecipeTags
+
+pytestmark = pytest.mark.django_db
+
+
+def filter_by_tags(*slugs):
+    response = APIClient().get("/api/recipes/", {"tags": slugs, "limit": 50})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_recipe_with_several_tags_is_returned_once(tags, make_recipes):
+    recipes = make_recipes(3, ingredients_per_recipe=1)
+    # Каждый рецепт уже отмечен tag-0 и tag-1.
+    RecipeTags.objects.create(recipe=recipes[0], tag=tags[2])
+
+    data = filter_by_tags("tag-0", "tag-1", "tag-2")
+    ids = [recipe["id"] for recipe in data["results"]]
+    assert sorted(ids) == sorted(recipe.id for recipe in recipes)
+    assert data["count"] == 3
+
+
+def test_filter_by_one_tag(tags, make_recipes):
+    recipes = make_recipes(2, ingredients_per_recipe=1)
+    RecipeTags.objects.filter(recipe=recipes[1]).delete()
+    RecipeTags.objects.create(recipe=recipes[1], tag=tags[2])
+
+    data = filter_by_tags("tag-2")
+    assert [recipe["id"] for recipe in data["results"]] == [recipes[1].id]
+    assert filter_by_tags("tag-0")["count"] == 1
+
+
+def test_unknown_tag_is_rejected(tags):
+    response = APIClient().get("/api/recipes/", {"tags": "missing"})
+    assert response.status_code == 400
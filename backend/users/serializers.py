@@ -1,6 +1,9 @@
+from django.conf import settings
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers, status
 
+from api.fields import RecipeImageField
+from api.fieldsets import SparseFieldsetMixin
 from recipes.models import Recipes
 from .models import CustomUser, Follow
 
@@ -32,7 +35,7 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         return user
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(SparseFieldsetMixin, UserSerializer):
     """Сериализатор авторизированного пользовател."""
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
@@ -48,6 +51,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
@@ -56,6 +61,8 @@ class CustomUserSerializer(UserSerializer):
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор кратких сведений о рецепте."""
+    image = RecipeImageField(thumbnail=settings.RECIPE_SHORT_THUMBNAIL,
+                             read_only=True)
 
     class Meta:
         model = Recipes
@@ -89,14 +96,28 @@ class FollowSerializer(CustomUserSerializer):
             )
         return data
 
+    @staticmethod
+    def get_recipes_limit(request):
+        """Возвращает значение параметра recipes_limit или None."""
+        recipes_limit = request.query_params.get("recipes_limit")
+        if recipes_limit and recipes_limit.isdigit():
+            return int(recipes_limit)
+        return None
+
     @staticmethod
     def get_recipes_count(obj):
+        if hasattr(obj, "recipes_count"):
+            return obj.recipes_count
         return obj.recipes.count()
 
     def get_recipes(self, obj):
-        request = self.context.get("request")
-        recipes = obj.recipes.all()
-        recipes_limit = request.query_params.get("recipes_limit")
-        if recipes_limit:
-            recipes = recipes[: int(recipes_limit)]
+        recipes_by_author = self.context.get("recipes_by_author")
+        if recipes_by_author is not None:
+            recipes = recipes_by_author.get(obj.id, [])
+        else:
+            recipes = obj.recipes.all()
+            recipes_limit = self.get_recipes_limit(
+                self.context.get("request"))
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return ShortRecipeSerializer(recipes, many=True).data
@@ -0,0 +1,22 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CustomUser, Follow
+
+
+@receiver(post_save, sender=Follow)
+def increment_followers_count(sender, instance, created, **kwargs):
+    """Увеличивает счетчик подписчиков автора."""
+    if created:
+        CustomUser.objects.filter(pk=instance.author_id).update(
+            followers_count=F("followers_count") + 1,
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_followers_count(sender, instance, **kwargs):
+    """Уменьшает счетчик подписчиков автора."""
+    CustomUser.objects.filter(
+        pk=instance.author_id, followers_count__gt=0,
+    ).update(followers_count=F("followers_count") - 1)
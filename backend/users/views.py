@@ -1,3 +1,4 @@
+from django.db.models import BooleanField, Count, Exists, F, OuterRef, Value
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.generics import get_object_or_404
@@ -5,18 +6,35 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
 
-from api.pagination import CustomPageNumberPagination
+from api.fieldsets import Fieldset
+from api.pagination import (
+    CursorPaginationMixin,
+    CustomPageNumberPagination,
+    SubscriptionsCursorPagination
+)
+from recipes.models import Recipes
 from .models import CustomUser, Follow
 from .serializers import CustomUserSerializer, FollowSerializer
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(CursorPaginationMixin, UserViewSet):
     """Представление для пользователей."""
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = (IsAuthenticated,)
     pagination_class = CustomPageNumberPagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_anonymous or not Fieldset(self.request).wants(
+                "is_subscribed"):
+            return queryset
+        return queryset.annotate(
+            is_subscribed=Exists(Follow.objects.filter(
+                user=user, author=OuterRef("pk"))),
+        )
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -45,12 +63,27 @@ class CustomUserViewSet(UserViewSet):
         detail=False,
         methods=['get'],
         permission_classes=[IsAuthenticated],
-        pagination_class=CustomPageNumberPagination
+        pagination_class=CustomPageNumberPagination,
+        cursor_pagination_class=SubscriptionsCursorPagination,
     )
     def subscriptions(self, request):
-        queryset = CustomUser.objects.filter(following__user=request.user)
+        fieldset = Fieldset(request)
+        queryset = CustomUser.objects.filter(
+            following__user=request.user,
+        ).annotate(
+            subscription_id=F("following__id"),
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by("username")
+        if fieldset.wants("recipes_count"):
+            queryset = queryset.annotate(
+                recipes_count=Count("recipes", distinct=True),
+            )
         pages = self.paginate_queryset(queryset)
-        serializer = FollowSerializer(
-            pages, many=True, context={'request': request}
-        )
+        context = {'request': request}
+        if fieldset.wants("recipes"):
+            context['recipes_by_author'] = Recipes.objects.latest_by_author(
+                [author.id for author in pages],
+                FollowSerializer.get_recipes_limit(request),
+            )
+        serializer = FollowSerializer(pages, many=True, context=context)
         return self.get_paginated_response(serializer.data)